@@ -0,0 +1,241 @@
+"""
+Order rollups for the analytics endpoints.
+
+Every order write adds or subtracts its contribution to one row per granularity
+in `order_rollups`, so revenue charts read a handful of pre-aggregated buckets
+instead of scanning `orders`. Order items are likewise folded into per-product
+daily totals in `product_sales_daily`, which the top-products ranking sums over
+its 7/30/90 day window; items of cancelled orders are left out of those totals,
+and are subtracted or added back when an order enters or leaves `cancelled`. Run `python -m app.analytics rebuild` to recompute both
+tables from scratch, e.g. after a bulk import that bypassed the API.
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import async_session, init_db, upsert
+from app.models import Order, OrderItem, OrderRollup, Product, ProductSalesDaily
+
+GRANULARITIES = ("hour", "day", "week", "month")
+
+SALES_WINDOWS = (7, 30, 90)
+
+REBUILD_BATCH_SIZE = 5000
+
+CANCELLED = "cancelled"
+
+
+def counts_as_sale(status: str | None) -> bool:
+    return status != CANCELLED
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def aggregate(changes) -> list[dict]:
+    """Fold (created_at, status, total_amount, sign) tuples into rollup rows."""
+    buckets = defaultdict(lambda: [0, 0.0])
+    for created_at, status, amount, sign in changes:
+        for granularity in GRANULARITIES:
+            bucket = buckets[(granularity, bucket_start(created_at, granularity), status or "pending")]
+            bucket[0] += sign
+            bucket[1] += sign * (amount or 0)
+
+    return [
+        {"granularity": g, "bucket_start": b, "status": s, "order_count": count, "revenue": revenue}
+        for (g, b, s), (count, revenue) in buckets.items()
+        if count or revenue
+    ]
+
+
+async def record_order_changes(db: AsyncSession, changes):
+    """Apply order deltas to the rollups inside the caller's transaction."""
+    rows = aggregate(changes)
+    if not rows:
+        return
+    stmt = upsert(
+        db.bind.dialect.name,
+        OrderRollup.__table__,
+        keys=["granularity", "bucket_start", "status"],
+        increment=["order_count", "revenue"],
+    )
+    await db.execute(stmt, rows)
+
+
+async def revenue_series(
+    db: AsyncSession,
+    granularity: str,
+    status: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[dict]:
+    query = (
+        select(
+            OrderRollup.bucket_start,
+            func.sum(OrderRollup.order_count),
+            func.sum(OrderRollup.revenue),
+        )
+        .where(OrderRollup.granularity == granularity)
+        .group_by(OrderRollup.bucket_start)
+        .having(func.sum(OrderRollup.order_count) != 0)
+        .order_by(OrderRollup.bucket_start)
+    )
+    if status:
+        query = query.where(OrderRollup.status == status)
+    if start:
+        query = query.where(OrderRollup.bucket_start >= bucket_start(start, granularity))
+    if end:
+        query = query.where(OrderRollup.bucket_start <= end)
+
+    result = await db.execute(query)
+    return [
+        {
+            "bucket_start": bucket,
+            "order_count": count or 0,
+            "revenue": revenue or 0,
+            "average_order_value": (revenue or 0) / count if count else 0,
+        }
+        for bucket, count, revenue in result.all()
+    ]
+
+
+async def order_totals(db: AsyncSession) -> tuple[int, float]:
+    """All-time order count and revenue, summed from the monthly rollups."""
+    result = await db.execute(
+        select(func.sum(OrderRollup.order_count), func.sum(OrderRollup.revenue))
+        .where(OrderRollup.granularity == "month")
+    )
+    count, revenue = result.one()
+    return count or 0, revenue or 0
+
+
+async def rebuild_rollups(db: AsyncSession) -> int:
+    """Recompute every rollup row from the orders table. Returns the number of orders read."""
+    await db.execute(delete(OrderRollup))
+
+    total = 0
+    result = await db.stream(
+        select(Order.created_at, Order.status, Order.total_amount)
+        .execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    changes = []
+    async for created_at, status, amount in result:
+        changes.append((created_at, status, amount, 1))
+        if len(changes) >= REBUILD_BATCH_SIZE:
+            await record_order_changes(db, changes)
+            total += len(changes)
+            changes = []
+    if changes:
+        await record_order_changes(db, changes)
+        total += len(changes)
+
+    await db.commit()
+    return total
+
+
+async def record_product_sales(db: AsyncSession, ordered_at: datetime, items, sign: int = 1):
+    """Add (product_id, quantity, price) items to the daily sales totals of `ordered_at`."""
+    day = bucket_start(ordered_at, "day")
+    totals = defaultdict(lambda: [0, 0.0])
+    for product_id, quantity, price in items:
+        totals[product_id][0] += sign * quantity
+        totals[product_id][1] += sign * quantity * price
+    if not totals:
+        return
+    stmt = upsert(
+        db.bind.dialect.name,
+        ProductSalesDaily.__table__,
+        keys=["day", "product_id"],
+        increment=["units", "revenue"],
+    )
+    await db.execute(stmt, [
+        {"day": day, "product_id": product_id, "units": units, "revenue": revenue}
+        for product_id, (units, revenue) in totals.items()
+    ])
+
+
+async def record_order_sales(db: AsyncSession, order_ids, sign: int = 1):
+    """Add the items of `order_ids` to the daily sales totals, or remove them with sign=-1."""
+    result = await db.execute(
+        select(OrderItem.created_at, OrderItem.product_id, OrderItem.quantity, OrderItem.price)
+        .where(OrderItem.order_id.in_(order_ids))
+    )
+    by_day = defaultdict(list)
+    for created_at, product_id, quantity, price in result:
+        by_day[bucket_start(created_at, "day")].append((product_id, quantity, price))
+    for day, items in by_day.items():
+        await record_product_sales(db, day, items, sign)
+
+
+async def top_products(db: AsyncSession, days: int = 30, by: str = "units", limit: int = 5):
+    """Rank products by units or revenue over the last `days` days, including today."""
+    cutoff = bucket_start(datetime.utcnow(), "day") - timedelta(days=days - 1)
+    sales = (
+        select(
+            ProductSalesDaily.product_id,
+            func.sum(ProductSalesDaily.units).label("units"),
+            func.sum(ProductSalesDaily.revenue).label("revenue"),
+        )
+        .where(ProductSalesDaily.day >= cutoff)
+        .group_by(ProductSalesDaily.product_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(Product, sales.c.units, sales.c.revenue)
+        .join(sales, Product.id == sales.c.product_id)
+        .where(sales.c[by] > 0)
+        .order_by(sales.c[by].desc())
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def rebuild_product_sales(db: AsyncSession) -> int:
+    """Recompute the daily product sales from order items. Returns the number of items read."""
+    await db.execute(delete(ProductSalesDaily))
+
+    total = 0
+    result = await db.stream(
+        select(OrderItem.created_at, OrderItem.product_id, OrderItem.quantity, OrderItem.price)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.status != CANCELLED)
+        .order_by(OrderItem.created_at)
+        .execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    async for partition in result.partitions():
+        by_day = defaultdict(list)
+        for created_at, product_id, quantity, price in partition:
+            by_day[bucket_start(created_at, "day")].append((product_id, quantity, price))
+        for day, items in by_day.items():
+            await record_product_sales(db, day, items)
+        total += len(partition)
+
+    await db.commit()
+    return total
+
+
+async def main():
+    await init_db()
+    async with async_session() as session:
+        orders = await rebuild_rollups(session)
+        items = await rebuild_product_sales(session)
+    print(f"Rebuilt order rollups from {orders} orders and product sales from {items} items")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m app.analytics rebuild")
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_read_db
+from app.schemas import RevenueBucket, ProductSales
+from app.analytics import SALES_WINDOWS, revenue_series, top_products
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.get("/revenue", response_model=list[RevenueBucket])
+async def get_revenue(
+    granularity: Literal["hour", "day", "week", "month"] = "day",
+    status: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    return await revenue_series(db, granularity, status, start, end)
+
+
+@router.get("/top-products", response_model=list[ProductSales])
+async def get_top_products(
+    window: int = 30,
+    by: Literal["units", "revenue"] = "units",
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    if window not in SALES_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {SALES_WINDOWS}")
+    ranking = await top_products(db, window, by, limit)
+    return [ProductSales(product=p, units=units, revenue=revenue) for p, units, revenue in ranking]
@@ -1,7 +1,186 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 import bcrypt
+from fastapi import Header, HTTPException
+from jose import JWTError, jwt
+from app.config import settings
+from app.sessions import revocation_index
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def get_password_hash(password: str, rounds: int = None) -> str:
+    salt = bcrypt.gensalt(rounds=rounds or settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so hashing never blocks the event loop.
+
+    bcrypt releases the GIL, so threads hash in parallel. Once `workers` calls are
+    running and `max_queue` more are waiting, further calls are rejected with a 503
+    instead of piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: ThreadPoolExecutor | None = None
+        self.start()
+        self._pending = 0
+        self._stats = {"completed": 0, "failed": 0, "rejected": 0, "peak_pending": 0, "total_seconds": 0.0}
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.workers + self.max_queue:
+            self._stats["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many authentication requests, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        self._stats["peak_pending"] = max(self._stats["peak_pending"], self._pending)
+        start = time.perf_counter()
+        outcome = "failed"
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            outcome = "completed"
+            return result
+        finally:
+            self._pending -= 1
+            self._stats[outcome] += 1
+            self._stats["total_seconds"] += time.perf_counter() - start
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        finished = self._stats["completed"] + self._stats["failed"]
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            **self._stats,
+            "avg_seconds": self._stats["total_seconds"] / finished if finished else 0.0,
+        }
+
+    def start(self):
+        """Create the pool if it is not running, so the app can start again after a shutdown."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    user_id: int
+    email: str
+    type: str
+    expires_at: float
+    session_id: str | None = None
+
+
+class TokenCache:
+    """LRU of verified access tokens keyed by the token's SHA-256 digest.
+
+    Entries are dropped once their token expires, so a cache hit is always as
+    valid as a fresh signature check.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, Principal] = OrderedDict()
+
+    def get(self, key: bytes) -> Principal | None:
+        principal = self._entries.get(key)
+        if principal is None:
+            return None
+        if principal.expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return principal
+
+    def put(self, key: bytes, principal: Principal):
+        self._entries[key] = principal
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+
+
+def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
+    to_encode = data.copy()
+    now = datetime.utcnow()
+    to_encode["iat"] = now
+    to_encode["exp"] = now + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def decode_access_token(token: str) -> Principal:
+    key = hashlib.sha256(token.encode()).digest()
+    principal = token_cache.get(key)
+    if principal is not None:
+        if revocation_index.is_revoked(principal.session_id):
+            raise HTTPException(status_code=401, detail="Session revoked", headers={"WWW-Authenticate": "Bearer"})
+        return principal
+
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM], options={"require_exp": True}
+        )
+        principal = Principal(
+            user_id=int(payload["user_id"]),
+            email=payload["sub"],
+            type=payload.get("type", "customer"),
+            expires_at=float(payload["exp"]),
+            session_id=payload.get("sid"),
+        )
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+
+    if revocation_index.is_revoked(principal.session_id):
+        raise HTTPException(status_code=401, detail="Session revoked", headers={"WWW-Authenticate": "Bearer"})
+    token_cache.put(key, principal)
+    return principal
+
+
+async def get_current_principal(authorization: str | None = Header(None)) -> Principal:
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return decode_access_token(authorization[len("Bearer "):])
+
+
+async def get_current_customer_principal(authorization: str | None = Header(None)) -> Principal:
+    principal = await get_current_principal(authorization)
+    if principal.type != "customer":
+        raise HTTPException(status_code=403, detail="Not a customer account")
+    return principal
+
+
+async def get_current_admin_principal(authorization: str | None = Header(None)) -> Principal:
+    principal = await get_current_principal(authorization)
+    if principal.type != "admin":
+        raise HTTPException(status_code=403, detail="Not an admin account")
+    return principal
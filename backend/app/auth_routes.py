@@ -1,31 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from datetime import datetime, timedelta
-import secrets
-from app.database import get_db
+from app.database import get_db, update_row
 from app.models import Customer, User
 from app.schemas import (
-    CustomerRegister, CustomerLogin, ForgotPassword, ResetPassword,
-    CustomerResponse, Token, AdminResponse, AdminLogin, AdminToken
+    CustomerRegister, CustomerLogin, ForgotPassword, ResetPassword, VerifyEmail,
+    CustomerResponse, Token, AdminResponse, AdminLogin, AdminToken, RefreshRequest, TokenPair
+)
+from app.auth import (
+    Principal, password_hasher, create_access_token,
+    get_current_principal, get_current_customer_principal, get_current_admin_principal
+)
+from app.ratelimit import auth_limiter, client_ip
+from app.tokens import RESET_PASSWORD, VERIFY_EMAIL, issue_token, consume_token, send_token
+from app.sessions import (
+    issue_refresh_token, consume_refresh_token, revoke_session, revoke_session_by_token, revoke_user_sessions
 )
-from app.auth import get_password_hash, verify_password
-from jose import JWTError, jwt
-from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-SECRET_KEY = settings.SECRET_KEY
-ALGORITHM = "HS256"
-
-
-def create_access_token(data: dict) -> str:
-    to_encode = data.copy()
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+PROFILE_FIELDS = {"email", "username", "name", "phone", "address", "city", "country"}
 
 
 @router.post("/register", response_model=CustomerResponse, status_code=status.HTTP_201_CREATED)
-async def register(customer: CustomerRegister, db: AsyncSession = Depends(get_db)):
+async def register(customer: CustomerRegister, background: BackgroundTasks, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Customer).where(Customer.email == customer.email))
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -34,8 +32,7 @@ async def register(customer: CustomerRegister, db: AsyncSession = Depends(get_db
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Username already taken")
     
-    hashed_password = get_password_hash(customer.password)
-    verification_token = secrets.token_urlsafe(32)
+    hashed_password = await password_hasher.hash(customer.password)
     
     db_customer = Customer(
         email=customer.email,
@@ -43,20 +40,23 @@ async def register(customer: CustomerRegister, db: AsyncSession = Depends(get_db
         hashed_password=hashed_password,
         name=customer.name,
         phone=customer.phone,
-        verification_token=verification_token,
     )
     db.add(db_customer)
+    await db.flush()
+    token = await issue_token(db, db_customer.id, VERIFY_EMAIL)
     await db.commit()
     await db.refresh(db_customer)
+    background.add_task(send_token, db_customer.email, VERIFY_EMAIL, token)
     return db_customer
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: CustomerLogin, db: AsyncSession = Depends(get_db)):
+async def login(credentials: CustomerLogin, request: Request, db: AsyncSession = Depends(get_db)):
+    await auth_limiter.check("login", client_ip(request), credentials.email)
     result = await db.execute(select(Customer).where(Customer.email == credentials.email))
     customer = result.scalar_one_or_none()
     
-    if not customer or not verify_password(credentials.password, customer.hashed_password):
+    if not customer or not await password_hasher.verify(credentials.password, customer.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -68,81 +68,82 @@ async def login(credentials: CustomerLogin, db: AsyncSession = Depends(get_db)):
             detail="Account is deactivated"
         )
     
-    access_token = create_access_token({"sub": customer.email, "user_id": customer.id})
+    refresh_token, session_id = await issue_refresh_token(db, customer.id, "customer", customer.email)
+    await db.commit()
+    access_token = create_access_token(
+        {"sub": customer.email, "user_id": customer.id, "type": "customer", "sid": session_id}
+    )
     return Token(
         access_token=access_token,
         token_type="bearer",
+        refresh_token=refresh_token,
         customer=customer
     )
 
 
 @router.post("/forgot-password")
-async def forgot_password(data: ForgotPassword, db: AsyncSession = Depends(get_db)):
+async def forgot_password(
+    data: ForgotPassword, request: Request, background: BackgroundTasks, db: AsyncSession = Depends(get_db)
+):
+    await auth_limiter.check("forgot-password", client_ip(request), data.email)
     result = await db.execute(select(Customer).where(Customer.email == data.email))
     customer = result.scalar_one_or_none()
     
     if customer:
-        reset_token = secrets.token_urlsafe(32)
-        customer.reset_token = reset_token
-        customer.reset_token_expires = datetime.utcnow() + timedelta(hours=1)
+        token = await issue_token(db, customer.id, RESET_PASSWORD)
         await db.commit()
+        # Sent after the response, so its timing does not reveal which emails exist.
+        background.add_task(send_token, customer.email, RESET_PASSWORD, token)
     
     return {"message": "If the email exists, a reset link has been sent"}
 
 
 @router.post("/reset-password")
 async def reset_password(data: ResetPassword, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Customer).where(
-            Customer.reset_token == data.token,
-            Customer.reset_token_expires > datetime.utcnow()
-        )
-    )
-    customer = result.scalar_one_or_none()
-    
-    if not customer:
+    customer_id = await consume_token(db, data.token, RESET_PASSWORD)
+    if not customer_id:
+        await db.commit()
         raise HTTPException(status_code=400, detail="Invalid or expired token")
     
-    customer.hashed_password = get_password_hash(data.new_password)
-    customer.reset_token = None
-    customer.reset_token_expires = None
+    hashed_password = await password_hasher.hash(data.new_password)
+    await update_row(db, Customer, customer_id, {"hashed_password": hashed_password})
+    await revoke_user_sessions(db, customer_id, "customer")
     await db.commit()
     
     return {"message": "Password reset successful"}
 
 
+@router.post("/verify-email")
+async def verify_email(data: VerifyEmail, db: AsyncSession = Depends(get_db)):
+    customer_id = await consume_token(db, data.token, VERIFY_EMAIL)
+    if not customer_id:
+        await db.commit()
+        raise HTTPException(status_code=400, detail="Invalid or expired token")
+    
+    await update_row(db, Customer, customer_id, {"is_verified": True})
+    await db.commit()
+    
+    return {"message": "Email verified"}
+
+
 @router.get("/me", response_model=CustomerResponse)
 async def get_current_customer(
-    db: AsyncSession = Depends(get_db),
-    authorization: str = None
+    principal: Principal = Depends(get_current_customer_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    token = authorization.replace("Bearer ", "")
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        if not email:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    result = await db.execute(select(Customer).where(Customer.email == email))
-    customer = result.scalar_one_or_none()
-    
+    customer = await db.get(Customer, principal.user_id)
     if not customer:
         raise HTTPException(status_code=404, detail="User not found")
-    
     return customer
 
 
 @router.post("/admin/login", response_model=AdminToken)
-async def admin_login(credentials: AdminLogin, db: AsyncSession = Depends(get_db)):
+async def admin_login(credentials: AdminLogin, request: Request, db: AsyncSession = Depends(get_db)):
+    await auth_limiter.check("admin-login", client_ip(request), credentials.email)
     result = await db.execute(select(User).where(User.email == credentials.email))
     admin = result.scalar_one_or_none()
     
-    if not admin or not verify_password(credentials.password, admin.hashed_password):
+    if not admin or not await password_hasher.verify(credentials.password, admin.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -160,42 +161,77 @@ async def admin_login(credentials: AdminLogin, db: AsyncSession = Depends(get_db
             detail="Not an admin account"
         )
     
-    access_token = create_access_token({"sub": admin.email, "user_id": admin.id, "type": "admin"})
+    refresh_token, session_id = await issue_refresh_token(db, admin.id, "admin", admin.email)
+    await db.commit()
+    access_token = create_access_token(
+        {"sub": admin.email, "user_id": admin.id, "type": "admin", "sid": session_id}
+    )
     return AdminToken(
         access_token=access_token,
         token_type="bearer",
+        refresh_token=refresh_token,
         admin=admin
     )
 
 
+@router.post("/refresh", response_model=TokenPair)
+async def refresh_access_token(data: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    session = await consume_refresh_token(db, data.refresh_token)
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+
+    if session.user_type == "admin":
+        admin = await db.get(User, session.user_id)
+        allowed = admin is not None and admin.is_active and admin.is_superuser
+    else:
+        customer = await db.get(Customer, session.user_id)
+        allowed = customer is not None and customer.is_active
+    if not allowed:
+        await revoke_session(db, session.session_id)
+        await db.commit()
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is deactivated")
+
+    refresh_token, session_id = await issue_refresh_token(
+        db, session.user_id, session.user_type, session.email, session.session_id
+    )
+    await db.commit()
+    access_token = create_access_token(
+        {"sub": session.email, "user_id": session.user_id, "type": session.user_type, "sid": session_id}
+    )
+    return TokenPair(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+
+@router.post("/logout")
+async def logout(data: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    await revoke_session_by_token(db, data.refresh_token)
+    await db.commit()
+    return {"message": "Logged out"}
+
+
+@router.post("/logout-all")
+async def logout_all(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    await revoke_user_sessions(db, principal.user_id, principal.type)
+    await db.commit()
+    return {"message": "All sessions revoked"}
+
+
 @router.put("/profile", response_model=CustomerResponse)
 async def update_profile(
     data: dict,
-    db: AsyncSession = Depends(get_db),
-    authorization: str = None
+    principal: Principal = Depends(get_current_customer_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    token = authorization.replace("Bearer ", "")
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        if not email:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    result = await db.execute(select(Customer).where(Customer.email == email))
-    customer = result.scalar_one_or_none()
-    
+    values = {k: v for k, v in data.items() if k in PROFILE_FIELDS and v is not None}
+    customer = await update_row(db, Customer, principal.user_id, values)
     if not customer:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    for key, value in data.items():
-        if hasattr(customer, key) and value is not None:
-            setattr(customer, key, value)
-    
     await db.commit()
-    await db.refresh(customer)
     return customer
+
+
+@router.get("/hashing-stats")
+async def hashing_stats(principal: Principal = Depends(get_current_admin_principal)):
+    return password_hasher.stats()
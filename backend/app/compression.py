@@ -0,0 +1,181 @@
+"""
+Response compression negotiated through Accept-Encoding.
+
+CompressionMiddleware gzips or Brotli-compresses complete JSON/text responses of
+at least COMPRESSION_MIN_SIZE bytes. Streamed responses (NDJSON reports) and
+bodies that already carry a Content-Encoding pass through untouched. Large
+bodies are compressed on the thread pool so the event loop keeps serving.
+
+Catalog listings go further through `precompressed_json`: the body gets a weak
+ETag (same content, whatever the coding), and each encoding is compressed once
+per ETag and kept in a small LRU. Repeat requests for an unchanged listing
+either get a 304 or reuse the cached bytes. Brotli is used when the `brotli`
+package is installed.
+"""
+import gzip
+import hashlib
+from collections import OrderedDict
+import orjson
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+THREADPOOL_THRESHOLD = 256 * 1024
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """The preferred encoding the client accepts (q > 0), or None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    candidates = [(accepted.get(enc, wildcard), -i, enc) for i, enc in enumerate(ENCODINGS)]
+    q, _, encoding = max(candidates)
+    return encoding if q > 0 else None
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "br":
+        quality = settings.BROTLI_CACHE_QUALITY if cached else settings.BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL, mtime=0)
+
+
+async def compress_async(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if len(body) >= THREADPOOL_THRESHOLD:
+        return await run_in_threadpool(compress, body, encoding, cached)
+    return compress(body, encoding, cached)
+
+
+def add_vary(headers: MutableHeaders):
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start: Message | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or message["status"] < 200 or message["status"] in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            if message.get("more_body"):
+                # Streamed: forward as-is so each chunk reaches the client immediately.
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            headers = MutableHeaders(raw=start["headers"])
+            if len(body) >= self.minimum_size:
+                body = await compress_async(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                add_vary(headers)
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class PrecompressedCache:
+    """Compressed bodies keyed by (ETag, encoding), least recently used evicted first."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+    async def get(self, etag: str, body: bytes, encoding: str) -> bytes:
+        key = (etag, encoding)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        compressed = await compress_async(body, encoding, cached=True)
+        self.entries[key] = compressed
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return compressed
+
+
+precompressed_cache = PrecompressedCache(settings.PRECOMPRESSED_CACHE_SIZE)
+
+
+def make_etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+async def precompressed_response(
+    request: Request, body: bytes, media_type: str = "application/json", etag: str | None = None
+) -> Response:
+    """Serve `body` with an ETag, answering If-None-Match with 304 and reusing the
+    cached compressed bytes for the negotiated encoding."""
+    etag = etag or make_etag(body)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    if encoding and len(body) >= settings.COMPRESSION_MIN_SIZE:
+        body = await precompressed_cache.get(etag, body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
+
+
+async def precompressed_json(request: Request, content) -> Response:
+    return await precompressed_response(request, orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS))
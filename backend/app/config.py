@@ -3,9 +3,59 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite+aiosqlite:///./prodex.db"
+    DATABASE_READ_URL: str | None = None
+    READ_YOUR_WRITES_SECONDS: int = 5
+    DB_ECHO: bool = False
+    AUTO_MIGRATE: bool = True
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_CACHE_SIZE: int = -65536
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQL_INSTRUMENTATION: bool = True
+    SQL_REPEAT_THRESHOLD: int = 5
+
+    COMPRESSION_MIN_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+    BROTLI_CACHE_QUALITY: int = 9
+    PRECOMPRESSED_CACHE_SIZE: int = 128
+
+    CATALOG_SNAPSHOTS: bool = True
+    SNAPSHOT_DEBOUNCE_SECONDS: float = 1.0
+    SNAPSHOT_POLL_SECONDS: int = 5
+
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    SESSION_SYNC_SECONDS: int = 5
+    SETTINGS_SYNC_SECONDS: int = 5
+    TOKEN_CLEANUP_SECONDS: int = 3600
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_HASH_WORKERS: int = 4
+    TOKEN_CACHE_SIZE: int = 10000
+    RATE_LIMIT_BACKEND: str = "memory"
+    AUTH_IP_RATE_BURST: int = 20
+    AUTH_IP_RATE_PER_MINUTE: float = 10
+    AUTH_ACCOUNT_RATE_BURST: int = 5
+    AUTH_ACCOUNT_RATE_PER_MINUTE: float = 1
+    RATE_LIMIT_SWEEP_SECONDS: int = 600
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
+    STOREFRONT_URL: str = "http://localhost:5173"
+    MAIL_BACKEND: str = "none"
+    MAIL_FROM: str = "Prodex <no-reply@localhost>"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_STARTTLS: bool = False
+    SMTP_USERNAME: str | None = None
+    SMTP_PASSWORD: str | None = None
 
     class Config:
         env_file = ".env"
@@ -1,10 +1,65 @@
+import os
+import time
+from fastapi import Request
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
+from sqlalchemy import event, make_url, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from app.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None, read_only: bool = False):
+    """WAL lets readers proceed while a writer commits; the rest trade a little
+    durability on power loss (not on crash) and memory for fewer syscalls."""
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+def create_engine_from_settings(url: str = settings.DATABASE_URL, tune_sqlite: bool = True, read_only: bool = False):
+    options = {"echo": settings.DB_ECHO, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    if not (is_sqlite and parsed.database in (None, "", ":memory:")):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    new_engine = create_async_engine(url, **options)
+    if is_sqlite and tune_sqlite:
+        event.listen(
+            new_engine.sync_engine,
+            "connect",
+            lambda conn, record: apply_sqlite_pragmas(conn, record, read_only=read_only),
+        )
+    return new_engine
+
+
+def read_only_sqlite_url(url: str) -> str | None:
+    """Turn a file-backed SQLite URL into a read-only (mode=ro) URI connection URL."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    path = os.path.abspath(parsed.database)
+    return parsed.set(database=f"file:{path}", query={"mode": "ro", "uri": "true"}).render_as_string()
+
+
+engine = create_engine_from_settings()
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+_read_url = settings.DATABASE_READ_URL or read_only_sqlite_url(settings.DATABASE_URL)
+read_engine = create_engine_from_settings(_read_url, read_only=True) if _read_url else engine
+async_read_session = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+STICKY_COOKIE = "db_primary_until"
+
 Base = declarative_base()
 
 
@@ -13,6 +68,76 @@ async def get_db():
         yield session
 
 
+async def get_read_db(request: Request):
+    """Session for read-only handlers. Uses the replica (or a read-only SQLite
+    connection) unless the client wrote something within READ_YOUR_WRITES_SECONDS,
+    in which case it reads from the primary so it sees its own changes."""
+    maker = async_session if wants_primary(request) else async_read_session
+    async with maker() as session:
+        yield session
+
+
+def wants_primary(request: Request) -> bool:
+    """Whether the client wrote something within READ_YOUR_WRITES_SECONDS."""
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    from app.migrations import upgrade
+
+    await upgrade()
+
+
+def upsert(dialect_name: str, table, keys: list[str], update: list[str] = (), increment: list[str] = ()):
+    """Build an INSERT that updates `update` columns and adds to `increment` columns on key conflict."""
+    if dialect_name == "mysql":
+        stmt = mysql.insert(table)
+        new = stmt.inserted
+    else:
+        stmt = (postgresql if dialect_name == "postgresql" else sqlite).insert(table)
+        new = stmt.excluded
+
+    set_ = {c: new[c] for c in update}
+    set_.update({c: table.c[c] + new[c] for c in increment})
+
+    if dialect_name == "mysql":
+        return stmt.on_duplicate_key_update(**set_) if set_ else stmt.prefix_with("IGNORE")
+    if not set_:
+        return stmt.on_conflict_do_nothing(index_elements=keys)
+    return stmt.on_conflict_do_update(index_elements=keys, set_=set_)
+
+
+async def update_returning(db: AsyncSession, stmt, *columns) -> list:
+    """Run an UPDATE and return `columns` of the affected rows.
+
+    Uses UPDATE ... RETURNING where the dialect supports it; otherwise the rows
+    are read with the same WHERE clause right before the update.
+    """
+    if db.bind.dialect.update_returning:
+        result = await db.execute(stmt.returning(*columns))
+        return result.all()
+    result = await db.execute(select(*columns).where(stmt.whereclause))
+    rows = result.all()
+    await db.execute(stmt)
+    return rows
+
+
+async def update_row(db: AsyncSession, model, row_id: int, values: dict):
+    """Apply `values` to one row in a single UPDATE ... RETURNING and return the updated
+    instance, or None if no such row exists. The caller commits."""
+    if not values:
+        return await db.get(model, row_id)
+    stmt = (
+        update(model)
+        .where(model.id == row_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if db.bind.dialect.update_returning:
+        result = await db.execute(stmt.returning(model))
+        return result.scalar_one_or_none()
+    await db.execute(stmt)
+    return await db.get(model, row_id)
@@ -0,0 +1,513 @@
+"""
+Bulk import of accounts and catalog products from JSON, NDJSON or CSV.
+
+Input is consumed as a stream of lines and processed in batches of
+IMPORT_BATCH_SIZE rows, each written with a single executemany and committed,
+so memory and transaction size stay bounded however large the input is. A JSON
+array is decoded one element at a time as its lines arrive (keep huge feeds
+pretty-printed or use NDJSON; a minified array is a single line). Rows that fail
+are reported by line number and skipped.
+
+Accounts are checked for duplicate emails and usernames with one set-based
+query per batch and hashed in parallel on a long-lived process pool (rows may
+instead carry a bcrypt `hashed_password`, which must be a well-formed hash).
+`is_superuser` is only honoured when the importer is itself a superuser. Products are validated with ProductCreate
+and upserted by SKU: new SKUs are inserted, existing ones get the supplied
+fields overwritten, and nothing is deleted, so the catalog stays online while
+a feed loads. Categories named by products are created when missing.
+
+    python -m app.importers customers accounts.ndjson
+    python -m app.importers users admins.csv --format csv
+    python -m app.importers products catalog.json
+"""
+import asyncio
+import csv
+import json
+import multiprocessing
+import re
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, EmailStr, ValidationError, field_validator
+from sqlalchemy import select, insert, or_
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import get_password_hash
+from app.config import settings
+from app.database import async_session, init_db, upsert
+from app.models import Category, Customer, Product, User
+from app.schemas import ProductCreate
+
+FORMATS = ("ndjson", "csv", "json")
+
+BCRYPT_HASH = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+
+class AccountImportRow(BaseModel):
+    @field_validator("hashed_password", check_fields=False)
+    @classmethod
+    def check_bcrypt_hash(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None and not BCRYPT_HASH.match(value):
+            raise ValueError("not a bcrypt hash")
+        return value
+
+
+class CustomerImportRow(AccountImportRow):
+    email: EmailStr
+    username: str
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+    name: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+    is_active: bool = True
+    is_verified: bool = False
+
+
+class UserImportRow(AccountImportRow):
+    email: EmailStr
+    username: str
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+    full_name: Optional[str] = None
+    is_active: bool = True
+    is_superuser: bool = False
+
+
+ACCOUNT_KINDS = {
+    "customers": (Customer, CustomerImportRow),
+    "users": (User, UserImportRow),
+}
+
+
+class ProductImportRow(ProductCreate):
+    sku: str
+    specifications: Optional[str] = None
+    features: Optional[str] = None
+
+
+class UndecodableLine(str):
+    """Stands in (as an empty line) for an input line that is not valid UTF-8."""
+
+
+UNDECODABLE = "line is not valid UTF-8"
+
+
+def decode_line(line: bytes) -> str:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return UndecodableLine()
+
+
+async def iter_lines(chunks):
+    """Split an async iterator of byte chunks into decoded lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield decode_line(line)
+    if buffer:
+        yield decode_line(buffer)
+
+
+async def file_chunks(path: str, size: int = 1 << 20):
+    with open(path, "rb") as f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+async def iter_json_array(lines):
+    """Yield (line_number, record, error) for each element of a top-level JSON array."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    buffer_line = 1
+    started = False
+    async for line in lines:
+        if isinstance(line, UndecodableLine):
+            yield buffer_line + buffer.count("\n"), None, UNDECODABLE
+        buffer += line + "\n"
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            line_no = buffer_line + buffer.count("\n", 0, pos)
+            if not started:
+                if buffer[pos] != "[":
+                    yield line_no, None, "expected a JSON array"
+                    return
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if not buffer[e.pos:].strip():
+                    break  # element continues on the next line
+                yield line_no, None, f"invalid JSON: {e.msg}"
+                pos = len(buffer)
+                break
+            if isinstance(record, dict):
+                yield line_no, record, None
+            else:
+                yield line_no, None, "expected a JSON object"
+        buffer_line += buffer.count("\n", 0, pos)
+        buffer = buffer[pos:]
+    rest = buffer.lstrip()
+    if rest or started:
+        line_no = buffer_line + buffer.count("\n", 0, len(buffer) - len(rest))
+        error = "unterminated JSON array"
+        if rest:
+            try:
+                json.loads(rest)
+            except json.JSONDecodeError as e:
+                error = f"invalid JSON: {e.msg}"
+        yield line_no, None, error
+
+
+async def iter_records(lines, fmt: str):
+    """Yield (line_number, record, error) for each non-blank input line, or for
+    each element when `fmt` is "json"."""
+    if fmt == "json":
+        async for item in iter_json_array(lines):
+            yield item
+        return
+    if fmt == "csv":
+        async for item in iter_csv(lines):
+            yield item
+        return
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if isinstance(line, UndecodableLine):
+            yield line_no, None, UNDECODABLE
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f"invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+async def iter_csv(lines):
+    """Yield (line_number, record, error) for each CSV row after the header.
+
+    One csv.reader parses the whole input. It is handed a row only once all of
+    the row's lines have arrived (an even number of quotes so far), so a quoted
+    field may span lines. A row is numbered by its first line.
+    """
+    pending = PendingLines()
+    reader = csv.reader(pending)
+    header = None
+    row_lines = []
+    quotes = 0
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if isinstance(line, UndecodableLine):
+            yield line_no, None, UNDECODABLE
+            continue
+        if not row_lines and not line.strip():
+            continue
+        row_lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        first_line = line_no - len(row_lines) + 1
+        pending.lines.extend(row_lines)
+        row_lines, quotes = [], 0
+        while pending.lines:
+            try:
+                values = next(reader)
+            except csv.Error as e:
+                yield first_line, None, f"invalid CSV: {e}"
+                continue
+            if header is None:
+                header = values
+            elif len(values) != len(header):
+                yield first_line, None, f"expected {len(header)} columns, got {len(values)}"
+            else:
+                yield first_line, {k: v for k, v in zip(header, values) if v != ""}, None
+    if row_lines:
+        yield line_no - len(row_lines) + 1, None, "unterminated quoted field"
+
+
+class PendingLines:
+    """Input of the CSV reader: the lines received so far. Unlike a generator it
+    can run dry and be refilled, so one reader lasts for the whole stream."""
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def batched(records, size: int):
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in error.errors())
+
+
+def hash_passwords(passwords: list[str], rounds: int) -> list[str]:
+    return [get_password_hash(p, rounds) for p in passwords]
+
+
+async def hash_in_parallel(pool: ProcessPoolExecutor, passwords: list[str], workers: int) -> list[str]:
+    if not passwords:
+        return []
+    loop = asyncio.get_running_loop()
+    step = -(-len(passwords) // workers)
+    parts = await asyncio.gather(*[
+        loop.run_in_executor(pool, hash_passwords, passwords[i:i + step], settings.BCRYPT_ROUNDS)
+        for i in range(0, len(passwords), step)
+    ])
+    return [h for part in parts for h in part]
+
+
+async def import_batch(
+    db: AsyncSession, model, schema, batch, seen: set, pool, workers: int, report: dict, exclude: set
+):
+    candidates = []
+    for line_no, record, error in batch:
+        if error:
+            report["errors"].append({"line": line_no, "error": error})
+            continue
+        try:
+            row = schema.model_validate(record)
+        except ValidationError as e:
+            report["errors"].append({"line": line_no, "error": validation_message(e)})
+            continue
+        if not row.password and not row.hashed_password:
+            report["errors"].append({"line": line_no, "error": "password or bcrypt hashed_password required"})
+            continue
+        keys = (("email", row.email), ("username", row.username))
+        duplicate = next((field for field, value in keys if (field, value) in seen), None)
+        if duplicate:
+            report["errors"].append({"line": line_no, "error": f"duplicate {duplicate} in input"})
+            continue
+        seen.update(keys)
+        candidates.append((line_no, row))
+
+    if not candidates:
+        return
+
+    result = await db.execute(
+        select(model.email, model.username).where(or_(
+            model.email.in_([row.email for _, row in candidates]),
+            model.username.in_([row.username for _, row in candidates]),
+        ))
+    )
+    existing = result.all()
+    existing_emails = {email for email, _ in existing}
+    existing_usernames = {username for _, username in existing}
+
+    rows = []
+    for line_no, row in candidates:
+        if row.email in existing_emails:
+            report["errors"].append({"line": line_no, "error": "email already registered"})
+        elif row.username in existing_usernames:
+            report["errors"].append({"line": line_no, "error": "username already taken"})
+        else:
+            rows.append((line_no, row))
+
+    to_hash = [row.password for _, row in rows if not row.hashed_password]
+    hashes = iter(await hash_in_parallel(pool, to_hash, workers))
+    values = []
+    for _, row in rows:
+        data = row.model_dump(exclude={"password", *exclude})
+        data["hashed_password"] = row.hashed_password or next(hashes)
+        values.append(data)
+
+    if not values:
+        return
+    try:
+        await db.execute(insert(model), values)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        report["errors"].extend(
+            {"line": line_no, "error": "conflicts with a concurrently inserted account"}
+            for line_no, _ in rows
+        )
+        return
+    report["inserted"] += len(values)
+
+
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+def hash_pool() -> ProcessPoolExecutor:
+    """The process pool imports hash passwords on, started on first use and kept
+    so each import does not pay for spawning workers (or for joining them)."""
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=settings.IMPORT_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+async def import_accounts(db: AsyncSession, kind: str, lines, fmt: str, allow_superuser: bool = True) -> dict:
+    """Import accounts of `kind` ("customers" or "users") from an async iterator of
+    lines. Without `allow_superuser`, `is_superuser` in the input is ignored."""
+    model, schema = ACCOUNT_KINDS[kind]
+    report = {"inserted": 0, "errors": []}
+    seen = set()
+    exclude = set() if allow_superuser else {"is_superuser"}
+    pool = hash_pool()
+    async for batch in batched(iter_records(lines, fmt), settings.IMPORT_BATCH_SIZE):
+        await import_batch(db, model, schema, batch, seen, pool, settings.IMPORT_HASH_WORKERS, report, exclude)
+    report["errors"].sort(key=lambda e: e["line"])
+    return report
+
+
+async def add_categories(db: AsyncSession, categories: dict, known: set):
+    """Insert the categories in `categories` ({name: description}) missing from `known`."""
+    missing = [{"name": name, "description": description}
+               for name, description in categories.items() if name not in known]
+    if missing:
+        await db.execute(insert(Category), missing)
+        known.update(row["name"] for row in missing)
+
+
+async def upsert_product_batch(db: AsyncSession, batch, categories: set) -> list[dict]:
+    """Validate and upsert one batch, committing it. Returns one result per input
+    line, in line order: {"line", "sku", "status": "upserted"} or {"line", "error"}."""
+    results = []
+    rows = {}
+    for line_no, record, error in batch:
+        if error:
+            results.append({"line": line_no, "error": error})
+            continue
+        try:
+            row = ProductImportRow.model_validate(record)
+        except ValidationError as e:
+            results.append({"line": line_no, "error": validation_message(e)})
+            continue
+        # Only the fields present in the feed are written, so a partial row
+        # updates those columns and leaves the rest of an existing product alone.
+        # A SKU repeated within the batch keeps its last row.
+        rows.pop(row.sku, None)
+        rows[row.sku] = row.model_dump(exclude_unset=True)
+        results.append({"line": line_no, "sku": row.sku, "status": "upserted"})
+
+    if rows:
+        # One statement per column set; a feed with uniform rows needs just one.
+        now = datetime.utcnow()
+        groups = defaultdict(list)
+        for values in rows.values():
+            values["updated_at"] = now
+            groups[tuple(sorted(values))].append(values)
+
+        table = Product.__table__
+        try:
+            for columns, values in groups.items():
+                stmt = upsert(db.bind.dialect.name, table, keys=["sku"], update=[c for c in columns if c != "sku"])
+                await db.execute(stmt, values)
+            await add_categories(
+                db, {values["category"]: None for values in rows.values() if values.get("category")}, categories
+            )
+            await db.commit()
+        except DBAPIError as e:
+            await db.rollback()
+            results = [
+                {"line": r["line"], "error": f"batch rejected by the database: {e.orig}"} if "sku" in r else r
+                for r in results
+            ]
+    return results
+
+
+async def iter_product_results(db: AsyncSession, records):
+    """Upsert products by SKU from an async iterator of (line_number, record, error),
+    yielding each batch's per-line results once the batch is committed."""
+    result = await db.execute(select(Category.name))
+    categories = set(result.scalars().all())
+    async for batch in batched(records, settings.IMPORT_BATCH_SIZE):
+        yield await upsert_product_batch(db, batch, categories)
+
+
+async def import_products(db: AsyncSession, records) -> dict:
+    report = {"upserted": 0, "errors": []}
+    async for results in iter_product_results(db, records):
+        for result in results:
+            if "error" in result:
+                report["errors"].append(result)
+            else:
+                report["upserted"] += 1
+    return report
+
+
+async def iter_objects(objects):
+    """Adapt an in-memory list of dicts to the (number, record, error) stream import_products reads."""
+    for number, record in enumerate(objects, 1):
+        yield number, record, None
+
+
+def detect_format(path: str) -> str:
+    if path.endswith(".csv"):
+        return "csv"
+    return "json" if path.endswith(".json") else "ndjson"
+
+
+async def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk import customers, admin users or catalog products")
+    parser.add_argument("kind", choices=sorted([*ACCOUNT_KINDS, "products"]))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS)
+    args = parser.parse_args(argv)
+    fmt = args.format or detect_format(args.path)
+
+    await init_db()
+    lines = iter_lines(file_chunks(args.path))
+    async with async_session() as db:
+        if args.kind == "products":
+            report = await import_products(db, iter_records(lines, fmt))
+        else:
+            report = await import_accounts(db, args.kind, lines, fmt)
+            shutdown_hash_pool()
+    for error in report["errors"]:
+        print(f"line {error['line']}: {error['error']}")
+    count = report["upserted"] if args.kind == "products" else report["inserted"]
+    print(f"Imported {count} {args.kind}, {len(report['errors'])} rows rejected")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+"""
+Outgoing mail.
+
+MAIL_BACKEND picks the transport: "none" (the default) drops each message,
+"smtp" sends it through SMTP_HOST, and "log" writes it to the "app.mail"
+logger. The log backend is for local development only: messages carry live
+password-reset and verification links. Routes send from a background task after
+the response, and an SMTP failure is logged rather than raised.
+"""
+import asyncio
+import logging
+import smtplib
+from email.message import EmailMessage
+from app.config import settings
+
+logger = logging.getLogger("app.mail")
+
+
+def send_smtp(message: EmailMessage):
+    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=10) as smtp:
+        if settings.SMTP_STARTTLS:
+            smtp.starttls()
+        if settings.SMTP_USERNAME:
+            smtp.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        smtp.send_message(message)
+
+
+async def send_mail(to: str, subject: str, body: str):
+    if settings.MAIL_BACKEND == "none":
+        return
+    if settings.MAIL_BACKEND == "log":
+        # Warning level so it shows without any logging setup; nothing was delivered.
+        logger.warning("MAIL_BACKEND=log, not sent. To %s: %s\n%s", to, subject, body)
+        return
+    message = EmailMessage()
+    message["From"] = settings.MAIL_FROM
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    try:
+        await asyncio.to_thread(send_smtp, message)
+    except Exception:
+        logger.exception("Failed to send mail to %s", to)
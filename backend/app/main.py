@@ -1,29 +1,81 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
 from contextlib import asynccontextmanager
+import asyncio
+from app.config import settings
 from app.database import init_db
+from app.auth import password_hasher
+from app.importers import shutdown_hash_pool
+from app.ratelimit import auth_limiter
+from app.sessions import revocation_index
+from app.snapshots import catalog_snapshots
+from app.store_settings import store_settings
+from app.tokens import run_cleanup
 from app.routes import router
 from app.auth_routes import router as auth_router
+from app.analytics_routes import router as analytics_router
+from app.pagination import NEXT_CURSOR_HEADER
+from app.middleware import read_your_writes, sql_instrumentation
+from app.compression import CompressionMiddleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
+    password_hasher.start()
+    if settings.AUTO_MIGRATE:
+        await init_db()
+    await revocation_index.sync()
+    await store_settings.load()
+    background = [
+        asyncio.create_task(revocation_index.run()),
+        asyncio.create_task(store_settings.run()),
+        asyncio.create_task(run_cleanup()),
+        asyncio.create_task(auth_limiter.run()),
+    ]
+    if settings.CATALOG_SNAPSHOTS:
+        await catalog_snapshots.rebuild()
+        background.append(asyncio.create_task(catalog_snapshots.run()))
     yield
+    for task in background:
+        task.cancel()
+    password_hasher.shutdown()
+    shutdown_hash_pool()
 
 
 app = FastAPI(title="Prodex Admin API", lifespan=lifespan)
 
+# Innermost, so it sees each response as one body rather than the chunks the
+# function middlewares below re-stream it as.
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+app.middleware("http")(read_your_writes)
+if settings.SQL_INSTRUMENTATION:
+    app.middleware("http")(sql_instrumentation)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://localhost:3000", "http://localhost:8000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing"],
 )
 
+
+@app.exception_handler(IntegrityError)
+async def integrity_error(request: Request, exc: IntegrityError):
+    # A write that collides with a unique key, or breaks a constraint the
+    # schemas do not check, is a client error rather than a 500.
+    message = str(exc.orig).lower()
+    if "unique" in message or "duplicate" in message:
+        return JSONResponse(status_code=409, content={"detail": "Conflicts with an existing record"})
+    return JSONResponse(status_code=400, content={"detail": "Violates a database constraint"})
+
+
 app.include_router(router)
 app.include_router(auth_router)
+app.include_router(analytics_router)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+import json
+import logging
+import time
+from fastapi import Request
+from app.config import settings
+from app.database import STICKY_COOKIE, engine, read_engine
+from app.instrumentation import QueryStats, current_stats
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+logger = logging.getLogger("app.sql")
+
+
+async def read_your_writes(request: Request, call_next):
+    """After a successful write, pin the client's reads to the primary for a few
+    seconds so replica lag never hides its own changes (see get_read_db)."""
+    response = await call_next(request)
+    if read_engine is not engine and request.method in MUTATING_METHODS and response.status_code < 400:
+        response.set_cookie(
+            STICKY_COOKIE,
+            str(time.time() + settings.READ_YOUR_WRITES_SECONDS),
+            max_age=settings.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
+async def sql_instrumentation(request: Request, call_next):
+    """Count the statements a request runs and the time spent in the database.
+    Totals go out in a Server-Timing header and one JSON log line per request;
+    a statement shape repeated SQL_REPEAT_THRESHOLD times (usually an N+1 loop)
+    is logged as a warning."""
+    stats = QueryStats()
+    token = current_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_stats.reset(token)
+    total_ms = (time.perf_counter() - started) * 1000
+    db_ms = stats.seconds * 1000
+
+    response.headers.append(
+        "Server-Timing", f'db;dur={db_ms:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+    )
+    route = request.scope.get("route")
+    record = {
+        "method": request.method,
+        "path": request.url.path,
+        "route": getattr(route, "path", None),
+        "status": response.status_code,
+        "queries": stats.count,
+        "db_ms": round(db_ms, 2),
+        "total_ms": round(total_ms, 2),
+    }
+    logger.info(json.dumps(record))
+    for shape, count in stats.repeated(settings.SQL_REPEAT_THRESHOLD):
+        logger.warning(json.dumps({**record, "event": "repeated_statement", "count": count, "statement": shape}))
+    return response
@@ -0,0 +1,153 @@
+"""
+Versioned schema migrations.
+
+`create_all` only creates missing tables, so index and column changes never
+reached databases created by an earlier version of the app. Each migration
+below runs once, in order, inside its own transaction, and the applied
+versions are recorded in `schema_migrations`. Migrations must be idempotent
+(create with checkfirst, inspect before altering) because a fresh database
+gets the full current schema from the baseline step. A migration is either a
+sync function run on the connection, or a coroutine function taking the async
+connection, for data migrations that reuse the app's async code.
+
+The app applies pending migrations at startup when AUTO_MIGRATE is set;
+otherwise run them explicitly:
+
+    python -m app.migrations upgrade
+    python -m app.migrations status
+"""
+import asyncio
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Base, engine
+from app import models  # noqa: F401  registers the tables on Base.metadata
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version: int, name: str):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def create_indexes(conn, table_name: str, *index_names: str):
+    table = Base.metadata.tables[table_name]
+    for index in table.indexes:
+        if index.name in index_names:
+            index.create(conn, checkfirst=True)
+
+
+@migration(1, "baseline schema")
+def baseline(conn):
+    Base.metadata.create_all(conn)
+
+
+@migration(2, "indexes for catalog filters, order listing and cart lookups")
+def hot_column_indexes(conn):
+    create_indexes(conn, "products", "ix_products_category", "ix_products_brand", "ix_products_is_active")
+    create_indexes(
+        conn,
+        "orders",
+        "ix_orders_created_at_id",
+        "ix_orders_status_created_at_id",
+        "ix_orders_customer_email_created_at_id",
+    )
+    create_indexes(conn, "cart_items", "ix_cart_items_cart_id_product_id")
+
+
+@migration(3, "scraper crawl state")
+def scrape_state(conn):
+    Base.metadata.tables["scrape_state"].create(conn, checkfirst=True)
+
+
+@migration(4, "products.updated_at index for the catalog snapshot fingerprint")
+def product_updated_at_index(conn):
+    create_indexes(conn, "products", "ix_products_updated_at")
+
+
+@migration(5, "backfill analytics rollups from existing orders")
+async def backfill_analytics(conn):
+    # Rollups are only maintained by order writes, so orders that predate them
+    # would otherwise never be counted. The session joins the migration's
+    # transaction; its commits do not end it.
+    from app.analytics import rebuild_product_sales, rebuild_rollups
+
+    async with AsyncSession(bind=conn) as db:
+        await rebuild_rollups(db)
+        await rebuild_product_sales(db)
+
+
+@migration(6, "settings version counter")
+def settings_version_table(conn):
+    Base.metadata.tables["settings_version"].create(conn, checkfirst=True)
+
+
+@migration(7, "rate_limit_buckets.updated_at index for the idle bucket sweep")
+def rate_limit_updated_at_index(conn):
+    create_indexes(conn, "rate_limit_buckets", "ix_rate_limit_buckets_updated_at")
+
+
+async def applied_versions(conn) -> set[int]:
+    await conn.run_sync(metadata.create_all)
+    result = await conn.execute(select(schema_migrations.c.version))
+    return set(result.scalars().all())
+
+
+async def upgrade(target_engine=engine) -> list[int]:
+    """Apply pending migrations in order and return the versions applied."""
+    async with target_engine.begin() as conn:
+        done = await applied_versions(conn)
+
+    applied = []
+    for version, name, fn in sorted(MIGRATIONS):
+        if version in done:
+            continue
+        async with target_engine.begin() as conn:
+            if asyncio.iscoroutinefunction(fn):
+                await fn(conn)
+            else:
+                await conn.run_sync(fn)
+            await conn.execute(
+                schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow())
+            )
+        applied.append(version)
+    return applied
+
+
+async def status(target_engine=engine) -> list[tuple[int, str, bool]]:
+    async with target_engine.begin() as conn:
+        done = await applied_versions(conn)
+    return [(version, name, version in done) for version, name, _ in sorted(MIGRATIONS)]
+
+
+async def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations")
+    parser.add_argument("command", choices=["upgrade", "status"])
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = await upgrade()
+        print(f"Applied migrations: {applied}" if applied else "Database is up to date")
+    else:
+        for version, name, done in await status():
+            print(f"{'x' if done else ' '} {version:4d}  {name}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
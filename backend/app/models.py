@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index, UniqueConstraint
 from datetime import datetime
 from app.database import Base
 
@@ -24,22 +24,27 @@ class Product(Base):
     description = Column(String(2000))
     price = Column(Float, nullable=False)
     stock = Column(Integer, default=0)
-    category = Column(String(100))
+    category = Column(String(100), index=True)
     sku = Column(String(100), unique=True)
-    brand = Column(String(100))
+    brand = Column(String(100), index=True)
     model = Column(String(100))
     image_url = Column(String(500))
     thumbnail = Column(String(500))
     gallery = Column(String(2000))
     specifications = Column(String(2000))
     features = Column(String(2000))
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_orders_customer_email_created_at_id", "customer_email", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     order_number = Column(String(100), unique=True, nullable=False)
@@ -93,6 +98,9 @@ class Cart(Base):
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        Index("ix_cart_items_cart_id_product_id", "cart_id", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cart_id = Column(Integer, index=True, nullable=False)
@@ -111,3 +119,102 @@ class Setting(Base):
     setting_value = Column(String(500))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SettingsVersion(Base):
+    """Single row counting writes to `settings`, bumped in the same transaction."""
+    __tablename__ = "settings_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+class OrderRollup(Base):
+    __tablename__ = "order_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "status", name="uq_order_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(10), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    status = Column(String(50), nullable=False)
+    order_count = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0, nullable=False)
+
+
+class OrderItem(Base):
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, index=True, nullable=False)
+    product_id = Column(Integer, index=True, nullable=False)
+    quantity = Column(Integer, default=1, nullable=False)
+    price = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ProductSalesDaily(Base):
+    __tablename__ = "product_sales_daily"
+    __table_args__ = (
+        UniqueConstraint("day", "product_id", name="uq_product_sales_daily_day_product"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(DateTime, nullable=False)
+    product_id = Column(Integer, index=True, nullable=False)
+    units = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0, nullable=False)
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_user", "user_type", "user_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    session_id = Column(String(64), index=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    user_type = Column(String(20), nullable=False)
+    email = Column(String(255), nullable=False)
+    expires_at = Column(DateTime, index=True, nullable=False)
+    used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(255), unique=True, nullable=False)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, index=True, nullable=False)
+
+
+class AuthToken(Base):
+    __tablename__ = "auth_tokens"
+    __table_args__ = (
+        Index("ix_auth_tokens_customer_purpose", "customer_id", "purpose"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    purpose = Column(String(20), nullable=False)
+    customer_id = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, index=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ScrapeState(Base):
+    __tablename__ = "scrape_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sku = Column(String(100), unique=True, nullable=False)
+    url = Column(String(500))
+    content_hash = Column(String(64), nullable=False)
+    first_seen_at = Column(DateTime, default=datetime.utcnow)
+    last_seen_at = Column(DateTime, default=datetime.utcnow, index=True)
+    changed_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,43 @@
+"""
+Opaque keyset cursors for list endpoints ordered by (created_at desc, id desc).
+
+The cursor is the sort key of the last row on a page, so the next page is an
+index range scan that starts where the previous one stopped instead of an
+OFFSET that re-reads every earlier row.
+"""
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after(query, created_at_column, id_column, cursor: str | None):
+    """Restrict `query` to rows that sort after `cursor` in (created_at desc, id desc) order."""
+    query = query.order_by(created_at_column.desc(), id_column.desc())
+    if not cursor:
+        return query
+    created_at, row_id = decode_cursor(cursor)
+    return query.where(tuple_(created_at_column, id_column) < tuple_(created_at, row_id))
+
+
+def page(rows: list, limit: int, response) -> list:
+    """Trim the look-ahead row fetched with `limit + 1` and expose the next cursor header."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows
@@ -0,0 +1,131 @@
+"""
+Token-bucket throttling for the authentication endpoints.
+
+Each bucket holds up to `burst` tokens and refills at `per_minute` tokens per
+minute; a request spends one token or is rejected with 429. Login, admin login
+and forgot-password check a per-IP and a per-account bucket before doing any
+database or bcrypt work.
+
+The default backend keeps buckets in process memory, which is exact for a
+single worker. With several workers set RATE_LIMIT_BACKEND=database to keep
+the buckets in the `rate_limit_buckets` table instead; each check is then one
+conditional UPDATE, so concurrent workers cannot overspend a bucket. A bucket
+left idle long enough to refill is the same as no bucket, so those rows are
+deleted every RATE_LIMIT_SWEEP_SECONDS.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, Request
+from sqlalchemy import case, delete, literal, update
+from app.config import settings
+from app.database import async_session, upsert
+from app.models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, burst: int, rate: float, now: float) -> float:
+        """Spend one token; return 0 if allowed, otherwise seconds until a token is available."""
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return 0
+
+    async def purge_idle(self, before: float) -> int:
+        # Least recently used first, so stop at the first bucket still in use.
+        purged = 0
+        while self._buckets and next(iter(self._buckets.values()))[1] < before:
+            self._buckets.popitem(last=False)
+            purged += 1
+        return purged
+
+
+class DatabaseBackend:
+    async def take(self, key: str, burst: int, rate: float, now: float) -> float:
+        table = RateLimitBucket.__table__
+        refilled = table.c.tokens + (literal(now) - table.c.updated_at) * rate
+        refilled = case((refilled > burst, burst), else_=refilled)
+
+        async with async_session() as db:
+            await db.execute(
+                upsert(db.bind.dialect.name, table, keys=["key"]),
+                {"key": key, "tokens": burst, "updated_at": now},
+            )
+            result = await db.execute(
+                update(table)
+                .where(table.c.key == key, refilled >= 1)
+                .values(tokens=refilled - 1, updated_at=now)
+            )
+            await db.commit()
+        return 0 if result.rowcount else 1 / rate
+
+    async def purge_idle(self, before: float) -> int:
+        async with async_session() as db:
+            result = await db.execute(delete(RateLimitBucket).where(RateLimitBucket.updated_at < before))
+            await db.commit()
+        return result.rowcount
+
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def refill_seconds() -> float:
+        """Longest time any bucket takes to refill from empty."""
+        return max(
+            settings.AUTH_IP_RATE_BURST * 60 / settings.AUTH_IP_RATE_PER_MINUTE,
+            settings.AUTH_ACCOUNT_RATE_BURST * 60 / settings.AUTH_ACCOUNT_RATE_PER_MINUTE,
+        )
+
+    async def purge_idle(self) -> int:
+        return await self.backend.purge_idle(time.time() - self.refill_seconds())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(settings.RATE_LIMIT_SWEEP_SECONDS)
+            try:
+                purged = await self.purge_idle()
+                if purged:
+                    logger.info("Purged %d idle rate limit buckets", purged)
+            except Exception:
+                logger.exception("Failed to purge idle rate limit buckets")
+
+    async def check(self, scope: str, ip: str | None, account: str | None):
+        now = time.time()
+        limits = [
+            (f"{scope}:ip:{ip}", settings.AUTH_IP_RATE_BURST, settings.AUTH_IP_RATE_PER_MINUTE),
+            (f"{scope}:account:{(account or '').lower()}", settings.AUTH_ACCOUNT_RATE_BURST, settings.AUTH_ACCOUNT_RATE_PER_MINUTE),
+        ]
+        for key, burst, per_minute in limits:
+            if key.endswith(":"):
+                continue
+            retry_after = await self.backend.take(key, burst, per_minute / 60, now)
+            if retry_after:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many attempts, please try again later",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+
+BACKENDS = {"memory": MemoryBackend, "database": DatabaseBackend}
+
+auth_limiter = RateLimiter(BACKENDS[settings.RATE_LIMIT_BACKEND]())
+
+
+def client_ip(request: Request) -> str | None:
+    return request.client.host if request.client else None
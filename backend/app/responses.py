@@ -0,0 +1,27 @@
+import orjson
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON encoded with orjson, which handles datetimes natively. For content that is
+    already plain data; see app.serializers."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """A StreamingResponse that can be sent while the request body is still being read.
+
+    Under ASGI spec < 2.4 (uvicorn reports 2.3) StreamingResponse listens for the
+    client disconnecting by calling receive() alongside the body iterator, which
+    would swallow request body chunks the iterator is still consuming. Here the
+    iterator is the only reader; a client that goes away surfaces as
+    ClientDisconnect from request.stream() instead.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -1,23 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from app.database import get_db
-from app.models import User, Product, Order, Category, Customer, Cart, CartItem, Setting
+from sqlalchemy import select, func, delete, update
+from datetime import datetime
+from app.database import async_session, get_db, get_read_db, update_returning, update_row, wants_primary
+from app.models import User, Product, Order, OrderItem, Category, Customer, Cart, CartItem
 from app.schemas import (
     UserCreate, UserResponse,
-    ProductCreate, ProductResponse,
-    OrderCreate, OrderResponse,
-    CategoryCreate, CategoryResponse,
-    CustomerCreate, CustomerResponse,
+    ProductCreate, ProductUpdate, ProductResponse,
+    OrderCreate, OrderUpdate, OrderResponse, BulkStatusUpdate, BulkStatusResult,
+    CategoryCreate, CategoryUpdate, CategoryResponse,
+    CustomerCreate, CustomerUpdate, CustomerResponse,
     DashboardStats,
     CartResponse, CartItemResponse, CartItemCreate, AddToCartRequest, UpdateCartItemRequest, CartProductResponse
 )
-from app.auth import get_password_hash
+from app.auth import Principal, get_current_admin_principal, password_hasher
+from app.analytics import (
+    counts_as_sale, order_totals, record_order_changes, record_order_sales, record_product_sales, top_products
+)
+from app.pagination import keyset_after, page
+from app.importers import FORMATS, import_accounts, iter_lines, iter_product_results, iter_records
+from app.responses import DuplexStreamingResponse
+from app.serializers import as_dicts, fast_json, orm_to_dict, select_fields
+from app.compression import precompressed_json, precompressed_response
+from app.snapshots import catalog_snapshots
+from app.store_settings import store_settings
 import httpx
+import json
 
 router = APIRouter()
 
+ORDER_STATUS_TRANSITIONS = {
+    "pending": {"processing", "shipped", "cancelled"},
+    "processing": {"shipped", "cancelled"},
+    "shipped": {"delivered"},
+    "delivered": set(),
+    "cancelled": set(),
+}
+
+
+def order_filters(status=None, date_from=None, date_to=None, email=None) -> list:
+    conditions = []
+    if status:
+        conditions.append(Order.status == status)
+    if date_from:
+        conditions.append(Order.created_at >= date_from)
+    if date_to:
+        conditions.append(Order.created_at < date_to)
+    if email:
+        conditions.append(Order.customer_email == email)
+    return conditions
+
 
 @router.get("/")
 async def root():
@@ -53,41 +86,36 @@ async def proxy_image(url: str):
 
 
 @router.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
+async def get_dashboard_stats(db: AsyncSession = Depends(get_read_db)):
     user_count = await db.scalar(select(func.count(User.id)))
     product_count = await db.scalar(select(func.count(Product.id)))
-    order_count = await db.scalar(select(func.count(Order.id)))
-    total_revenue = await db.scalar(select(func.sum(Order.total_amount))) or 0
+    order_count, total_revenue = await order_totals(db)
 
     recent_orders = await db.execute(
-        select(Order).order_by(Order.created_at.desc()).limit(5)
+        select_fields(Order, OrderResponse).order_by(Order.created_at.desc()).limit(5)
     )
-    recent_orders = recent_orders.scalars().all()
 
-    top_products = await db.execute(
-        select(Product).order_by(Product.created_at.desc()).limit(5)
-    )
-    top_products = top_products.scalars().all()
-
-    return DashboardStats(
-        total_users=user_count or 0,
-        total_products=product_count or 0,
-        total_orders=order_count or 0,
-        total_revenue=total_revenue,
-        recent_orders=[OrderResponse.model_validate(o) for o in recent_orders],
-        top_products=[ProductResponse.model_validate(p) for p in top_products]
-    )
+    best_sellers = await top_products(db, days=30, limit=5)
+
+    return fast_json({
+        "total_users": user_count or 0,
+        "total_products": product_count or 0,
+        "total_orders": order_count or 0,
+        "total_revenue": total_revenue,
+        "recent_orders": as_dicts(recent_orders),
+        "top_products": [orm_to_dict(p, ProductResponse) for p, _, _ in best_sellers],
+    })
 
 
 @router.get("/users", response_model=list[UserResponse])
-async def get_users(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User))
-    return result.scalars().all()
+async def get_users(db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(select_fields(User, UserResponse))
+    return fast_json(as_dicts(result))
 
 
 @router.post("/users", response_model=UserResponse)
 async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -100,10 +128,35 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     return db_user
 
 
+@router.post("/users/import")
+async def import_users(
+    request: Request,
+    format: str = "ndjson",
+    principal: Principal = Depends(get_current_admin_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {FORMATS}")
+    # Only a current superuser may hand out superuser rights.
+    importer = await db.get(User, principal.user_id)
+    allow_superuser = bool(importer and importer.is_active and importer.is_superuser)
+    return await import_accounts(db, "users", iter_lines(request.stream()), format, allow_superuser)
+
+
 @router.get("/products", response_model=list[ProductResponse])
-async def get_products(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Product))
-    return result.scalars().all()
+async def get_products(request: Request, category: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    # The prebuilt snapshot, unless it lags a write made here or the client has
+    # just written and must read from the primary.
+    snapshot = catalog_snapshots.fresh()
+    if snapshot and not wants_primary(request):
+        body, etag = snapshot.listing(category)
+        return await precompressed_response(request, body, etag=etag)
+
+    query = select_fields(Product, ProductResponse)
+    if category is not None:
+        query = query.where(Product.category == category)
+    result = await db.execute(query)
+    return await precompressed_json(request, as_dicts(result))
 
 
 @router.post("/products", response_model=ProductResponse)
@@ -112,11 +165,42 @@ async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_
     db.add(db_product)
     await db.commit()
     await db.refresh(db_product)
+    catalog_snapshots.mark_dirty()
     return db_product
 
 
+@router.post("/products/bulk")
+async def bulk_upsert_products(
+    request: Request,
+    format: str = "ndjson",
+    principal: Principal = Depends(get_current_admin_principal),
+):
+    """Upsert products by SKU from a streamed body, one product per line. The
+    response streams one JSON result per input line as each batch commits,
+    followed by a summary line."""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {FORMATS}")
+
+    async def report():
+        upserted = rejected = 0
+        # The response outlives the request's dependencies, so it opens its own session.
+        async with async_session() as db:
+            records = iter_records(iter_lines(request.stream()), format)
+            async for results in iter_product_results(db, records):
+                for result in results:
+                    if "error" in result:
+                        rejected += 1
+                    else:
+                        upserted += 1
+                yield "".join(json.dumps(result) + "\n" for result in results)
+        catalog_snapshots.mark_dirty()
+        yield json.dumps({"summary": {"upserted": upserted, "rejected": rejected}}) + "\n"
+
+    return DuplexStreamingResponse(report(), media_type="application/x-ndjson")
+
+
 @router.get("/products/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int, db: AsyncSession = Depends(get_db)):
+async def get_product(product_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Product).where(Product.id == product_id))
     product = result.scalar_one_or_none()
     if not product:
@@ -126,16 +210,21 @@ async def get_product(product_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.put("/products/{product_id}", response_model=ProductResponse)
 async def update_product(product_id: int, product: ProductCreate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Product).where(Product.id == product_id))
-    db_product = result.scalar_one_or_none()
+    db_product = await update_row(db, Product, product_id, product.model_dump())
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
-    
-    for key, value in product.model_dump().items():
-        setattr(db_product, key, value)
-    
     await db.commit()
-    await db.refresh(db_product)
+    catalog_snapshots.mark_dirty()
+    return db_product
+
+
+@router.patch("/products/{product_id}", response_model=ProductResponse)
+async def patch_product(product_id: int, product: ProductUpdate, db: AsyncSession = Depends(get_db)):
+    db_product = await update_row(db, Product, product_id, product.model_dump(exclude_unset=True))
+    if not db_product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    await db.commit()
+    catalog_snapshots.mark_dirty()
     return db_product
 
 
@@ -148,26 +237,112 @@ async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(db_product)
     await db.commit()
+    catalog_snapshots.mark_dirty()
     return {"message": "Product deleted successfully"}
 
 
 @router.get("/orders", response_model=list[OrderResponse])
-async def get_orders(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Order).order_by(Order.created_at.desc()))
-    return result.scalars().all()
+async def get_orders(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    status: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    email: str | None = None,
+    order_number: str | None = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    query = keyset_after(select_fields(Order, OrderResponse), Order.created_at, Order.id, cursor)
+    query = query.where(*order_filters(status, date_from, date_to, email))
+    if order_number:
+        query = query.where(Order.order_number == order_number)
+
+    result = await db.execute(query.limit(limit + 1))
+    return fast_json(as_dicts(page(result.all(), limit, response)), response)
 
 
 @router.post("/orders", response_model=OrderResponse)
 async def create_order(order: OrderCreate, db: AsyncSession = Depends(get_db)):
-    db_order = Order(**order.model_dump())
+    db_order = Order(**order.model_dump(exclude={"items"}))
     db.add(db_order)
+    await db.flush()
+    await record_order_changes(db, [(db_order.created_at, db_order.status, db_order.total_amount, 1)])
+    if order.items:
+        ids = {item.product_id for item in order.items}
+        result = await db.execute(select(Product.id, Product.price).where(Product.id.in_(ids)))
+        prices = dict(result.all())
+        unknown = sorted(ids - prices.keys())
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown product ids: {unknown}")
+        items = [(item.product_id, item.quantity, prices[item.product_id]) for item in order.items]
+        db.add_all([
+            OrderItem(
+                order_id=db_order.id, created_at=db_order.created_at,
+                product_id=product_id, quantity=quantity, price=price,
+            )
+            for product_id, quantity, price in items
+        ])
+        if counts_as_sale(db_order.status):
+            await record_product_sales(db, db_order.created_at, items)
     await db.commit()
     await db.refresh(db_order)
     return db_order
 
 
+@router.patch("/orders/bulk-status", response_model=BulkStatusResult)
+async def bulk_update_order_status(
+    request: BulkStatusUpdate,
+    principal: Principal = Depends(get_current_admin_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    if request.status not in ORDER_STATUS_TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid status: {request.status}")
+
+    conditions = order_filters(**request.filter.model_dump()) if request.filter else []
+    if request.ids is not None:
+        conditions.append(Order.id.in_(request.ids))
+    if not conditions:
+        raise HTTPException(status_code=400, detail="ids or filter required")
+
+    sources = [s for s, targets in ORDER_STATUS_TRANSITIONS.items() if request.status in targets]
+    skipped = await db.scalar(
+        select(func.count(Order.id)).where(*conditions, Order.status.not_in(sources))
+    )
+
+    now = datetime.utcnow()
+    by_status = {}
+    changes = []
+    moved_sales = []
+    # One UPDATE per allowed source status (at most two): RETURNING only sees the
+    # new status, and the rollups need the old one to move each order out of it.
+    for source in sources:
+        rows = await update_returning(
+            db,
+            update(Order)
+            .where(*conditions, Order.status == source)
+            .values(status=request.status, updated_at=now)
+            .execution_options(synchronize_session=False),
+            Order.id, Order.created_at, Order.total_amount,
+        )
+        if rows:
+            by_status[source] = len(rows)
+        for _, created_at, amount in rows:
+            changes.append((created_at, source, amount, -1))
+            changes.append((created_at, request.status, amount, 1))
+        if counts_as_sale(source) != counts_as_sale(request.status):
+            moved_sales.append((1 if counts_as_sale(request.status) else -1, [row[0] for row in rows]))
+
+    await record_order_changes(db, changes)
+    for sign, ids in moved_sales:
+        if ids:
+            await record_order_sales(db, ids, sign)
+    await db.commit()
+    return BulkStatusResult(updated=len(changes) // 2, skipped=skipped or 0, by_status=by_status)
+
+
 @router.get("/orders/{order_id}", response_model=OrderResponse)
-async def get_order(order_id: int, db: AsyncSession = Depends(get_db)):
+async def get_order(order_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Order).where(Order.id == order_id))
     order = result.scalar_one_or_none()
     if not order:
@@ -175,21 +350,40 @@ async def get_order(order_id: int, db: AsyncSession = Depends(get_db)):
     return order
 
 
-@router.put("/orders/{order_id}", response_model=OrderResponse)
-async def update_order(order_id: int, order: OrderCreate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Order).where(Order.id == order_id))
-    db_order = result.scalar_one_or_none()
+async def apply_order_update(db: AsyncSession, order_id: int, values: dict):
+    previous = None
+    if "status" in values or "total_amount" in values:
+        result = await db.execute(
+            select(Order.created_at, Order.status, Order.total_amount).where(Order.id == order_id)
+        )
+        previous = result.one_or_none()
+
+    db_order = await update_row(db, Order, order_id, values)
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
-    
-    for key, value in order.model_dump().items():
-        setattr(db_order, key, value)
-    
+
+    if previous:
+        await record_order_changes(db, [
+            (*previous, -1),
+            (db_order.created_at, db_order.status, db_order.total_amount, 1),
+        ])
+        # Cancelling an order takes its items out of the sales totals; reopening puts them back.
+        if counts_as_sale(previous.status) != counts_as_sale(db_order.status):
+            await record_order_sales(db, [order_id], 1 if counts_as_sale(db_order.status) else -1)
     await db.commit()
-    await db.refresh(db_order)
     return db_order
 
 
+@router.put("/orders/{order_id}", response_model=OrderResponse)
+async def update_order(order_id: int, order: OrderCreate, db: AsyncSession = Depends(get_db)):
+    return await apply_order_update(db, order_id, order.model_dump(exclude={"items"}))
+
+
+@router.patch("/orders/{order_id}", response_model=OrderResponse)
+async def patch_order(order_id: int, order: OrderUpdate, db: AsyncSession = Depends(get_db)):
+    return await apply_order_update(db, order_id, order.model_dump(exclude_unset=True))
+
+
 @router.delete("/orders/{order_id}")
 async def delete_order(order_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Order).where(Order.id == order_id))
@@ -197,15 +391,24 @@ async def delete_order(order_id: int, db: AsyncSession = Depends(get_db)):
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    await record_order_changes(db, [(db_order.created_at, db_order.status, db_order.total_amount, -1)])
+    items_result = await db.execute(select(OrderItem).where(OrderItem.order_id == order_id))
+    items = items_result.scalars().all()
+    if items and counts_as_sale(db_order.status):
+        await record_product_sales(
+            db, db_order.created_at, [(i.product_id, i.quantity, i.price) for i in items], sign=-1
+        )
+    if items:
+        await db.execute(delete(OrderItem).where(OrderItem.order_id == order_id))
     await db.delete(db_order)
     await db.commit()
     return {"message": "Order deleted successfully"}
 
 
 @router.get("/categories", response_model=list[CategoryResponse])
-async def get_categories(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Category))
-    return result.scalars().all()
+async def get_categories(request: Request, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(select_fields(Category, CategoryResponse))
+    return await precompressed_json(request, as_dicts(result))
 
 
 @router.post("/categories", response_model=CategoryResponse)
@@ -218,7 +421,7 @@ async def create_category(category: CategoryCreate, db: AsyncSession = Depends(g
 
 
 @router.get("/categories/{category_id}", response_model=CategoryResponse)
-async def get_category(category_id: int, db: AsyncSession = Depends(get_db)):
+async def get_category(category_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Category).where(Category.id == category_id))
     category = result.scalar_one_or_none()
     if not category:
@@ -228,16 +431,19 @@ async def get_category(category_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.put("/categories/{category_id}", response_model=CategoryResponse)
 async def update_category(category_id: int, category: CategoryCreate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Category).where(Category.id == category_id))
-    db_category = result.scalar_one_or_none()
+    db_category = await update_row(db, Category, category_id, category.model_dump())
+    if not db_category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    await db.commit()
+    return db_category
+
+
+@router.patch("/categories/{category_id}", response_model=CategoryResponse)
+async def patch_category(category_id: int, category: CategoryUpdate, db: AsyncSession = Depends(get_db)):
+    db_category = await update_row(db, Category, category_id, category.model_dump(exclude_unset=True))
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
-    
-    for key, value in category.model_dump().items():
-        setattr(db_category, key, value)
-    
     await db.commit()
-    await db.refresh(db_category)
     return db_category
 
 
@@ -254,9 +460,9 @@ async def delete_category(category_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/customers", response_model=list[CustomerResponse])
-async def get_customers(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Customer))
-    return result.scalars().all()
+async def get_customers(db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(select_fields(Customer, CustomerResponse))
+    return fast_json(as_dicts(result))
 
 
 @router.post("/customers", response_model=CustomerResponse)
@@ -268,8 +474,20 @@ async def create_customer(customer: CustomerCreate, db: AsyncSession = Depends(g
     return db_customer
 
 
+@router.post("/customers/import")
+async def import_customers(
+    request: Request,
+    format: str = "ndjson",
+    principal: Principal = Depends(get_current_admin_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {FORMATS}")
+    return await import_accounts(db, "customers", iter_lines(request.stream()), format)
+
+
 @router.get("/customers/{customer_id}", response_model=CustomerResponse)
-async def get_customer(customer_id: int, db: AsyncSession = Depends(get_db)):
+async def get_customer(customer_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Customer).where(Customer.id == customer_id))
     customer = result.scalar_one_or_none()
     if not customer:
@@ -279,16 +497,19 @@ async def get_customer(customer_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.put("/customers/{customer_id}", response_model=CustomerResponse)
 async def update_customer(customer_id: int, customer: CustomerCreate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Customer).where(Customer.id == customer_id))
-    db_customer = result.scalar_one_or_none()
+    db_customer = await update_row(db, Customer, customer_id, customer.model_dump())
+    if not db_customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    await db.commit()
+    return db_customer
+
+
+@router.patch("/customers/{customer_id}", response_model=CustomerResponse)
+async def patch_customer(customer_id: int, customer: CustomerUpdate, db: AsyncSession = Depends(get_db)):
+    db_customer = await update_row(db, Customer, customer_id, customer.model_dump(exclude_unset=True))
     if not db_customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    
-    for key, value in customer.model_dump().items():
-        setattr(db_customer, key, value)
-    
     await db.commit()
-    await db.refresh(db_customer)
     return db_customer
 
 
@@ -476,22 +697,14 @@ async def clear_cart(
 
 
 @router.get("/settings")
-async def get_settings(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Setting))
-    settings = result.scalars().all()
-    return {s.setting_key: s.setting_value for s in settings}
+async def get_settings():
+    return store_settings.raw()
 
 
 @router.put("/settings/{key}")
 async def update_setting(key: str, value: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Setting).where(Setting.setting_key == key))
-    setting = result.scalar_one_or_none()
-    
-    if setting:
-        setting.setting_value = value
-    else:
-        setting = Setting(setting_key=key, setting_value=value)
-        db.add(setting)
-    
-    await db.commit()
+    try:
+        await store_settings.set(db, key, value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid value for {key}: {e}")
     return {"message": "Setting updated", "key": key, "value": value}
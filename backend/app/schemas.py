@@ -1,6 +1,18 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from datetime import datetime
-from typing import Optional
+from typing import ClassVar, Optional
+
+
+class PartialUpdate(BaseModel):
+    """PATCH body: omitted fields are left alone, but NOT NULL columns cannot be set to null."""
+    not_nullable: ClassVar[tuple[str, ...]] = ()
+
+    @model_validator(mode="after")
+    def reject_nulls(self):
+        nulls = [name for name in self.not_nullable if name in self.model_fields_set and getattr(self, name) is None]
+        if nulls:
+            raise ValueError(f"{', '.join(nulls)} cannot be null")
+        return self
 
 
 class UserBase(BaseModel):
@@ -41,7 +53,9 @@ class ProductCreate(ProductBase):
     is_active: bool = True
 
 
-class ProductUpdate(BaseModel):
+class ProductUpdate(PartialUpdate):
+    not_nullable = ("name", "price")
+
     name: Optional[str] = None
     description: Optional[str] = None
     price: Optional[float] = None
@@ -74,8 +88,43 @@ class OrderBase(BaseModel):
     status: str = "pending"
 
 
+class OrderItemCreate(BaseModel):
+    """An ordered product. It is charged at the product's stored price."""
+    product_id: int
+    quantity: int = Field(1, gt=0)
+
+
 class OrderCreate(OrderBase):
-    pass
+    items: list[OrderItemCreate] = []
+
+
+class OrderUpdate(PartialUpdate):
+    not_nullable = ("order_number", "customer_name", "total_amount")
+
+    order_number: Optional[str] = None
+    customer_name: Optional[str] = None
+    customer_email: Optional[str] = None
+    total_amount: Optional[float] = None
+    status: Optional[str] = None
+
+
+class OrderFilter(BaseModel):
+    status: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    email: Optional[str] = None
+
+
+class BulkStatusUpdate(BaseModel):
+    status: str
+    ids: Optional[list[int]] = None
+    filter: Optional[OrderFilter] = None
+
+
+class BulkStatusResult(BaseModel):
+    updated: int
+    skipped: int
+    by_status: dict[str, int]
 
 
 class OrderResponse(OrderBase):
@@ -96,6 +145,13 @@ class CategoryCreate(CategoryBase):
     pass
 
 
+class CategoryUpdate(PartialUpdate):
+    not_nullable = ("name",)
+
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+
 class CategoryResponse(CategoryBase):
     id: int
     created_at: datetime
@@ -113,6 +169,19 @@ class DashboardStats(BaseModel):
     top_products: list
 
 
+class RevenueBucket(BaseModel):
+    bucket_start: datetime
+    order_count: int
+    revenue: float
+    average_order_value: float
+
+
+class ProductSales(BaseModel):
+    product: ProductResponse
+    units: int
+    revenue: float
+
+
 class CustomerRegister(BaseModel):
     email: EmailStr
     username: str
@@ -135,12 +204,27 @@ class ResetPassword(BaseModel):
     new_password: str
 
 
+class VerifyEmail(BaseModel):
+    token: str
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
     customer: "CustomerResponse"
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class TokenPair(BaseModel):
+    access_token: str
+    token_type: str
+    refresh_token: str
+
+
 class CustomerResponse(BaseModel):
     id: int
     email: EmailStr
@@ -171,6 +255,20 @@ class CustomerCreate(BaseModel):
     is_verified: bool = False
 
 
+class CustomerUpdate(PartialUpdate):
+    not_nullable = ("email", "username")
+
+    email: Optional[EmailStr] = None
+    username: Optional[str] = None
+    name: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+    is_active: Optional[bool] = None
+    is_verified: Optional[bool] = None
+
+
 class AdminLogin(BaseModel):
     email: EmailStr
     password: str
@@ -190,6 +288,7 @@ class AdminResponse(BaseModel):
 class AdminToken(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
     admin: AdminResponse
 
 
@@ -0,0 +1,42 @@
+"""
+Serialize list responses straight from row tuples.
+
+With `response_model=list[...]`, every ORM object is validated field by field
+(from_attributes) before it is encoded, although the database has already
+constrained the data. Handlers that opt in here select only the columns a
+response schema exposes, turn the row tuples into dicts and encode them with
+orjson, skipping validation. They keep their response_model so the OpenAPI
+schema is unchanged; returning a Response bypasses FastAPI's own validation.
+"""
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import select
+from app.responses import ORJSONResponse
+
+
+def select_fields(model, schema: type[BaseModel]):
+    """select() of the columns behind `schema`'s fields, named like the fields."""
+    return select(*[model.__table__.c[name] for name in schema.model_fields])
+
+
+def as_dicts(rows) -> list[dict]:
+    """Rows (or a Result) as dicts keyed by column label."""
+    rows = list(rows)
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def orm_to_dict(obj, schema: type[BaseModel]) -> dict:
+    """`schema`'s fields read off an already-loaded ORM instance, without validation."""
+    return {name: getattr(obj, name) for name in schema.model_fields}
+
+
+def fast_json(content, response: Response | None = None) -> ORJSONResponse:
+    """Encode `content` with orjson, keeping headers a handler set on its injected
+    Response (such as the pagination cursor)."""
+    fast = ORJSONResponse(content)
+    if response is not None:
+        fast.headers.raw.extend(response.headers.raw)
+    return fast
@@ -0,0 +1,136 @@
+"""
+Refresh-token sessions and the in-memory revocation index.
+
+A login opens a session: a random session id carried as the `sid` claim of
+every access token, plus a rotating refresh token stored only as its SHA-256
+hash in `refresh_tokens`. Revoking a session marks its rows in that table;
+each worker polls the table every SESSION_SYNC_SECONDS and keeps the ids of
+recently revoked sessions in a set, so checking an access token is a set
+lookup rather than a query. A revoked id only needs to stay in the set until
+the last access token issued for it has expired.
+"""
+import asyncio
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import async_session, update_returning
+from app.models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class RevocationIndex:
+    def __init__(self):
+        self._revoked: frozenset[str] = frozenset()
+
+    def is_revoked(self, session_id: str | None) -> bool:
+        return session_id is not None and session_id in self._revoked
+
+    def add(self, session_id: str):
+        self._revoked = self._revoked | {session_id}
+
+    async def sync(self):
+        cutoff = datetime.utcnow() - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        async with async_session() as db:
+            result = await db.execute(
+                select(RefreshToken.session_id).where(RefreshToken.revoked_at > cutoff).distinct()
+            )
+            self._revoked = frozenset(result.scalars().all())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(settings.SESSION_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Failed to sync session revocations")
+
+
+revocation_index = RevocationIndex()
+
+
+async def issue_refresh_token(
+    db: AsyncSession, user_id: int, user_type: str, email: str, session_id: str = None
+) -> tuple[str, str]:
+    """Store a new refresh token, opening a session unless `session_id` is given.
+    Returns (refresh_token, session_id); the caller commits."""
+    session_id = session_id or secrets.token_urlsafe(16)
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        token_hash=hash_token(token),
+        session_id=session_id,
+        user_id=user_id,
+        user_type=user_type,
+        email=email,
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token, session_id
+
+
+async def consume_refresh_token(db: AsyncSession, token: str) -> RefreshToken | None:
+    """Mark a refresh token used and return it, or None if it cannot be used.
+
+    Presenting a token that was already rotated means it leaked, so the whole
+    session is revoked.
+    """
+    result = await db.execute(select(RefreshToken).where(RefreshToken.token_hash == hash_token(token)))
+    row = result.scalar_one_or_none()
+    now = datetime.utcnow()
+    if not row or row.revoked_at or row.expires_at <= now:
+        return None
+    # Claim the token with a conditional UPDATE so that of two concurrent
+    # requests presenting it, exactly one wins; the loser is treated as reuse.
+    claimed = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.used_at.is_(None))
+        .values(used_at=now)
+    )
+    if claimed.rowcount != 1:
+        await revoke_session(db, row.session_id)
+        await db.commit()
+        return None
+    return row
+
+
+async def revoke_session(db: AsyncSession, session_id: str):
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.session_id == session_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    revocation_index.add(session_id)
+
+
+async def revoke_session_by_token(db: AsyncSession, token: str) -> bool:
+    result = await db.execute(
+        select(RefreshToken.session_id).where(RefreshToken.token_hash == hash_token(token))
+    )
+    session_id = result.scalar_one_or_none()
+    if session_id is None:
+        return False
+    await revoke_session(db, session_id)
+    return True
+
+
+async def revoke_user_sessions(db: AsyncSession, user_id: int, user_type: str):
+    rows = await update_returning(
+        db,
+        update(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.user_type == user_type,
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=datetime.utcnow()),
+        RefreshToken.session_id,
+    )
+    for (session_id,) in rows:
+        revocation_index.add(session_id)
@@ -0,0 +1,133 @@
+"""
+Prebuilt catalog snapshots.
+
+The storefront asks for the same product lists over and over, so instead of
+querying and encoding on each request the worker keeps the listings as ready
+JSON bytes: the full catalog plus one body per category, each with its ETag.
+GET /products serves those bytes directly (through the precompressed cache),
+with no database or serialization work on the request path.
+
+A snapshot is immutable and replaced with a single assignment, so a request
+sees either the old catalog or the new one, never a mix. Writes made through
+this worker call `mark_dirty`, and the rebuild runs SNAPSHOT_DEBOUNCE_SECONDS
+later so a burst of edits (or a bulk import) costs one rebuild. Until that
+rebuild has finished, `fresh()` returns None and GET /products queries the
+database, so a write is visible to the next read. Changes from other workers
+and from the import and scrape scripts are picked up by polling a cheap
+fingerprint of the products table every SNAPSHOT_POLL_SECONDS.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+import orjson
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+from app.compression import make_etag
+from app.config import settings
+from app.database import async_read_session
+from app.models import Product
+from app.schemas import ProductResponse
+from app.serializers import as_dicts, select_fields
+
+logger = logging.getLogger(__name__)
+
+EMPTY_LISTING = (b"[]", make_etag(b"[]"))
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    fingerprint: tuple
+    built_at: datetime
+    products: tuple[bytes, str]
+    categories: dict[str, tuple[bytes, str]] = field(default_factory=dict)
+
+    def listing(self, category: str | None = None) -> tuple[bytes, str]:
+        """(body, etag) of the full catalog or of one category."""
+        if category is None:
+            return self.products
+        return self.categories.get(category, EMPTY_LISTING)
+
+
+def encode(rows: list[dict]) -> tuple[bytes, str]:
+    body = orjson.dumps(rows, option=orjson.OPT_NON_STR_KEYS)
+    return body, make_etag(body)
+
+
+def build_snapshot(fingerprint: tuple, rows: list[dict]) -> CatalogSnapshot:
+    by_category: dict[str, list[dict]] = {}
+    for row in rows:
+        if row["category"] is not None:
+            by_category.setdefault(row["category"], []).append(row)
+    return CatalogSnapshot(
+        fingerprint=fingerprint,
+        built_at=datetime.utcnow(),
+        products=encode(rows),
+        categories={name: encode(items) for name, items in by_category.items()},
+    )
+
+
+async def product_fingerprint(db) -> tuple:
+    """Changes whenever a product is added, updated or deleted."""
+    result = await db.execute(select(func.count(Product.id), func.max(Product.id), func.max(Product.updated_at)))
+    return tuple(result.one())
+
+
+class CatalogSnapshots:
+    def __init__(self):
+        self.current: CatalogSnapshot | None = None
+        # Writes marked so far, and how many of them the current snapshot includes.
+        self._writes = 0
+        self._built_writes = 0
+        self._wake: asyncio.Event | None = None
+
+    @property
+    def dirty(self) -> bool:
+        return self._writes != self._built_writes
+
+    def fresh(self) -> CatalogSnapshot | None:
+        """The current snapshot, or None while a write made here is not in it yet."""
+        return None if self.dirty else self.current
+
+    def mark_dirty(self):
+        self._writes += 1
+        if self._wake is not None:
+            self._wake.set()
+
+    async def rebuild(self) -> CatalogSnapshot:
+        # Writes marked after this point may be missed by the read, so they keep it dirty.
+        writes = self._writes
+        async with async_read_session() as db:
+            fingerprint = await product_fingerprint(db)
+            result = await db.execute(select_fields(Product, ProductResponse).order_by(Product.id))
+            rows = as_dicts(result)
+        snapshot = await run_in_threadpool(build_snapshot, fingerprint, rows)
+        self.current = snapshot
+        self._built_writes = writes
+        return snapshot
+
+    async def is_stale(self) -> bool:
+        if self.current is None:
+            return True
+        async with async_read_session() as db:
+            return await product_fingerprint(db) != self.current.fingerprint
+
+    async def run(self):
+        # Created here rather than in __init__ so it belongs to the serving loop.
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.SNAPSHOT_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            if self.dirty:
+                await asyncio.sleep(settings.SNAPSHOT_DEBOUNCE_SECONDS)
+            self._wake.clear()
+            try:
+                if self.dirty or await self.is_stale():
+                    await self.rebuild()
+            except Exception:
+                logger.exception("Failed to rebuild the catalog snapshot")
+
+
+catalog_snapshots = CatalogSnapshots()
@@ -0,0 +1,134 @@
+"""
+Store settings held in memory.
+
+The `settings` table is loaded at startup into a registry that every reader
+uses, so reading a setting is a dict lookup rather than a query. Known keys are
+declared in SETTING_TYPES with a type and a default. A value is parsed when it
+is written, so a bad value is rejected at PUT /settings/{key} instead of
+surfacing wherever it is read. Unknown keys are kept as plain strings.
+
+A write updates the registry of the worker that handled it, and bumps the
+counter in `settings_version` in the same transaction. The other workers poll
+that counter every SETTINGS_SYNC_SECONDS and reload the table when it changes.
+A counter rather than the latest `updated_at`, because commit order and clocks
+on different hosts need not agree with timestamps.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import async_session, upsert
+from app.models import Setting, SettingsVersion
+
+logger = logging.getLogger(__name__)
+
+
+def parse_bool(value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in ("1", "true", "yes", "on"):
+        return True
+    if lowered in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+@dataclass(frozen=True)
+class SettingType:
+    parse: Callable[[str], Any]
+    default: Any = None
+
+
+SETTING_TYPES = {
+    "site_name": SettingType(str, "Prodex"),
+    "site_description": SettingType(str, ""),
+    "currency": SettingType(str, "USD"),
+    "tax_rate": SettingType(float, 0.0),
+    "low_stock_threshold": SettingType(int, 10),
+    "maintenance_mode": SettingType(parse_bool, False),
+}
+
+
+def parse_setting(key: str, raw: str | None) -> Any:
+    """The typed value of `raw` for `key`; raises ValueError if it does not parse."""
+    spec = SETTING_TYPES.get(key)
+    if spec is None or raw is None:
+        return raw
+    return spec.parse(raw)
+
+
+async def settings_version(db: AsyncSession) -> int:
+    version = await db.scalar(select(SettingsVersion.version).where(SettingsVersion.id == 1))
+    return version or 0
+
+
+async def bump_settings_version(db: AsyncSession):
+    stmt = upsert(db.bind.dialect.name, SettingsVersion.__table__, keys=["id"], increment=["version"])
+    await db.execute(stmt, {"id": 1, "version": 1})
+
+
+class StoreSettings:
+    def __init__(self):
+        self.version: int | None = None
+        self._raw: dict[str, str | None] = {}
+        self._values: dict[str, Any] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._values:
+            return self._values[key]
+        spec = SETTING_TYPES.get(key)
+        return spec.default if spec else default
+
+    def raw(self) -> dict[str, str | None]:
+        """Stored values as strings, the shape GET /settings returns."""
+        return dict(self._raw)
+
+    def _apply(self, rows: dict[str, str | None]):
+        values = {}
+        for key, raw in rows.items():
+            try:
+                values[key] = parse_setting(key, raw)
+            except ValueError:
+                logger.warning("Ignoring invalid stored value for setting %s: %r", key, raw)
+        self._raw, self._values = rows, values
+
+    async def load(self):
+        async with async_session() as db:
+            version = await settings_version(db)
+            result = await db.execute(select(Setting.setting_key, Setting.setting_value))
+            self._apply(dict(result.all()))
+        self.version = version
+
+    async def set(self, db: AsyncSession, key: str, raw: str) -> Any:
+        """Validate and store one setting; raises ValueError if it does not parse."""
+        value = parse_setting(key, raw)
+        result = await db.execute(select(Setting).where(Setting.setting_key == key))
+        setting = result.scalar_one_or_none()
+        if setting:
+            setting.setting_value = raw
+        else:
+            db.add(Setting(setting_key=key, setting_value=raw))
+        await bump_settings_version(db)
+        await db.commit()
+        self._raw = {**self._raw, key: raw}
+        self._values = {**self._values, key: value}
+        return value
+
+    async def sync(self):
+        async with async_session() as db:
+            version = await settings_version(db)
+        if version != self.version:
+            await self.load()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(settings.SETTINGS_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Failed to sync store settings")
+
+
+store_settings = StoreSettings()
@@ -0,0 +1,92 @@
+"""
+Single-use account tokens (password reset, email verification).
+
+Only the SHA-256 hash of a token is stored, in the uniquely indexed
+`auth_tokens.token_hash` column, so a lookup is an index probe and a leaked
+table does not leak usable tokens. Expired rows, along with expired refresh
+tokens, are deleted by `run_cleanup`, which the app starts at boot.
+"""
+import asyncio
+import logging
+import secrets
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.mailer import send_mail
+from app.database import async_session
+from app.models import AuthToken, RefreshToken
+from app.sessions import hash_token
+
+logger = logging.getLogger(__name__)
+
+RESET_PASSWORD = "reset_password"
+VERIFY_EMAIL = "verify_email"
+
+TOKEN_LIFETIMES = {
+    RESET_PASSWORD: timedelta(hours=1),
+    VERIFY_EMAIL: timedelta(days=7),
+}
+
+# Subject and storefront page (which reads ?token=) of the mail carrying each token.
+TOKEN_MAILS = {
+    RESET_PASSWORD: ("Reset your password", "/reset-password"),
+    VERIFY_EMAIL: ("Verify your email address", "/verify-email"),
+}
+
+
+async def issue_token(db: AsyncSession, customer_id: int, purpose: str) -> str:
+    """Replace any outstanding `purpose` token of the customer with a new one. The caller commits."""
+    await db.execute(
+        delete(AuthToken).where(AuthToken.customer_id == customer_id, AuthToken.purpose == purpose)
+    )
+    token = secrets.token_urlsafe(32)
+    db.add(AuthToken(
+        token_hash=hash_token(token),
+        purpose=purpose,
+        customer_id=customer_id,
+        expires_at=datetime.utcnow() + TOKEN_LIFETIMES[purpose],
+    ))
+    return token
+
+
+async def send_token(email: str, purpose: str, token: str):
+    """Mail the raw token as a storefront link. Call after the token is committed."""
+    subject, path = TOKEN_MAILS[purpose]
+    link = f"{settings.STOREFRONT_URL}{path}?{urlencode({'token': token})}"
+    await send_mail(email, subject, f"{subject}: {link}")
+
+
+async def consume_token(db: AsyncSession, token: str, purpose: str) -> int | None:
+    """Delete a valid token and return its customer id, or None if it is unknown or expired."""
+    result = await db.execute(
+        select(AuthToken).where(AuthToken.token_hash == hash_token(token), AuthToken.purpose == purpose)
+    )
+    row = result.scalar_one_or_none()
+    if not row:
+        return None
+    await db.delete(row)
+    if row.expires_at <= datetime.utcnow():
+        return None
+    return row.customer_id
+
+
+async def purge_expired(db: AsyncSession) -> int:
+    now = datetime.utcnow()
+    tokens = await db.execute(delete(AuthToken).where(AuthToken.expires_at <= now))
+    sessions = await db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= now))
+    await db.commit()
+    return tokens.rowcount + sessions.rowcount
+
+
+async def run_cleanup():
+    while True:
+        try:
+            async with async_session() as db:
+                purged = await purge_expired(db)
+            if purged:
+                logger.info("Purged %d expired tokens", purged)
+        except Exception:
+            logger.exception("Failed to purge expired tokens")
+        await asyncio.sleep(settings.TOKEN_CLEANUP_SECONDS)
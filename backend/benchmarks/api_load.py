@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput of the API under concurrent load, per scenario.
+
+The app runs in this process against a freshly seeded scratch SQLite database,
+driven either through httpx's ASGI transport (no sockets, measures the app
+itself) or through a real uvicorn server on a local port (--server uvicorn,
+adds HTTP parsing and the socket round trip). The image proxy fetches from a
+local origin stub, so no scenario leaves the machine.
+
+    browse          storefront category page: GET /products?category=..
+    product_detail  GET /products/{id}
+    add_to_cart     POST /cart/add
+    checkout        GET /cart, POST /orders, DELETE /cart/clear
+    dashboard       GET /dashboard/stats
+    image_proxy     GET /proxy-image against the origin stub
+
+Each scenario runs on its own for --seconds with --concurrency clients after a
+short warm-up. With --baseline the run exits non-zero if any scenario's p95 or
+throughput is worse than the baseline by more than --tolerance.
+
+benchmarks/baselines/api_load.json is the committed baseline, taken on main
+with the default options. Absolute numbers only compare on the same machine, so
+a CI runner or a developer laptop should regenerate it there from main first
+(the file records the machine it was taken on, and a mismatch is reported):
+
+    cd backend && python benchmarks/api_load.py --save-baseline benchmarks/baselines/api_load.json
+    cd backend && python benchmarks/api_load.py --baseline benchmarks/baselines/api_load.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "load.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.analytics import rebuild_product_sales, rebuild_rollups
+from app.database import create_engine_from_settings
+from app.main import app
+from app.migrations import upgrade
+from app.models import Category, Order, OrderItem, Product
+
+CATEGORIES = [f"Category {i}" for i in range(12)]
+IMAGE = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 60  # ~15 KB, JPEG magic bytes
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(IMAGE)))
+        self.end_headers()
+        self.wfile.write(IMAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_origin() -> tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OriginHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+async def seed(products: int, orders: int, origin: str):
+    """Fill the scratch database directly, bypassing the API, then rebuild the analytics rollups."""
+    engine = create_engine_from_settings(os.environ["DATABASE_URL"])
+    await upgrade(engine)
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    async with engine.begin() as conn:
+        await conn.execute(insert(Category), [{"name": name, "description": f"All of {name}"} for name in CATEGORIES])
+        await conn.execute(insert(Product), [
+            {"name": f"Product {i}", "description": "A product description " * 4, "price": round(5 + i % 95 + 0.99, 2),
+             "stock": 10 + i % 40, "category": CATEGORIES[i % len(CATEGORIES)], "sku": f"SKU-{i:06d}",
+             "brand": f"Brand {i % 7}", "model": f"M-{i}", "image_url": f"{origin}/p/{i}.jpg",
+             "thumbnail": f"{origin}/p/{i}_200x.jpg", "gallery": "", "is_active": True,
+             "created_at": now, "updated_at": now}
+            for i in range(products)
+        ])
+        order_rows, item_rows = [], []
+        for i in range(orders):
+            created = now - timedelta(minutes=rng.randrange(60 * 24 * 60))
+            picks = [(rng.randrange(products) + 1, rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]
+            order_rows.append({"id": i + 1, "order_number": f"SEED-{i}", "customer_name": f"Customer {i % 300}",
+                               "customer_email": f"c{i % 300}@example.com", "total_amount": 20.0 * len(picks),
+                               "status": rng.choice(["pending", "paid", "shipped", "delivered"]), "created_at": created})
+            item_rows += [{"order_id": i + 1, "product_id": pid, "quantity": qty, "price": 20.0, "created_at": created}
+                          for pid, qty in picks]
+        await conn.execute(insert(Order), order_rows)
+        await conn.execute(insert(OrderItem), item_rows)
+    async with AsyncSession(engine) as db:
+        await rebuild_rollups(db)
+        await rebuild_product_sales(db)
+    await engine.dispose()
+
+
+def check(response: httpx.Response) -> httpx.Response:
+    response.raise_for_status()
+    return response
+
+
+async def browse(client, ctx, rng, worker):
+    check(await client.get("/products", params={"category": rng.choice(CATEGORIES)},
+                           headers={"Accept-Encoding": "br, gzip"}))
+
+
+async def product_detail(client, ctx, rng, worker):
+    check(await client.get(f"/products/{rng.randrange(ctx['products']) + 1}"))
+
+
+async def add_to_cart(client, ctx, rng, worker):
+    check(await client.post("/cart/add", json={
+        "product_id": rng.randrange(ctx["products"]) + 1, "quantity": 1, "session_id": f"cart-{worker}-{rng.randrange(50)}",
+    }))
+
+
+async def checkout(client, ctx, rng, worker):
+    session_id = f"checkout-{worker}-{rng.getrandbits(32)}"
+    for _ in range(2):
+        check(await client.post("/cart/add", json={
+            "product_id": rng.randrange(ctx["products"]) + 1, "quantity": 1, "session_id": session_id,
+        }))
+    started = time.perf_counter()
+    cart = check(await client.get("/cart", params={"session_id": session_id})).json()
+    check(await client.post("/orders", json={
+        "order_number": session_id, "customer_name": "Load Test", "customer_email": "load@example.com",
+        "total_amount": cart["total_amount"],
+        "items": [{"product_id": i["product_id"], "quantity": i["quantity"]} for i in cart["items"]],
+    }))
+    check(await client.delete("/cart/clear", params={"session_id": session_id}))
+    # Filling the cart is setup; only the checkout requests count.
+    return time.perf_counter() - started
+
+
+async def dashboard(client, ctx, rng, worker):
+    check(await client.get("/dashboard/stats"))
+
+
+async def image_proxy(client, ctx, rng, worker):
+    check(await client.get("/proxy-image", params={"url": f"{ctx['origin']}/p/{rng.randrange(ctx['products'])}.jpg"}))
+
+
+SCENARIOS = {
+    "browse": browse,
+    "product_detail": product_detail,
+    "add_to_cart": add_to_cart,
+    "checkout": checkout,
+    "dashboard": dashboard,
+    "image_proxy": image_proxy,
+}
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run_scenario(client, ctx, fn, seconds: float, concurrency: int, warmup: float) -> dict:
+    latencies, errors = [], [0]
+
+    # A worker is one client, so concurrent requests never share a cart session.
+    async def worker(n: int, until: float, record: bool):
+        rng = random.Random(n)
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            try:
+                elapsed = await fn(client, ctx, rng, n)
+            except Exception:
+                if record:
+                    errors[0] += 1
+                continue
+            if record:
+                latencies.append(elapsed if elapsed is not None else time.perf_counter() - started)
+
+    await asyncio.gather(*[worker(i, time.perf_counter() + warmup, False) for i in range(concurrency)])
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(1000 + i, started + seconds, True) for i in range(concurrency)])
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    if not latencies:
+        return {"requests": 0, "errors": errors[0], "throughput": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput": len(latencies) / wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_uvicorn():
+    """Serve the app from a uvicorn server on its own thread and event loop."""
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=free_port(), log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{config.port}"
+
+
+async def run(args) -> dict:
+    origin_server, origin = start_origin()
+    await seed(args.products, args.orders, origin)
+    ctx = {"products": args.products, "origin": origin}
+    names = args.scenarios or list(SCENARIOS)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    if args.server == "uvicorn":
+        server, base_url = start_uvicorn()
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            for name in names:
+                results[name] = await run_scenario(client, ctx, SCENARIOS[name], args.seconds, args.concurrency, args.warmup)
+        server.should_exit = True
+    else:
+        # ASGITransport does not run the lifespan, which loads the caches the routes rely on.
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+                for name in names:
+                    results[name] = await run_scenario(client, ctx, SCENARIOS[name], args.seconds, args.concurrency, args.warmup)
+    origin_server.shutdown()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput']:.0f} -> {result['throughput']:.0f} req/s")
+    return regressions
+
+
+def machine() -> str:
+    return f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs, Python {platform.python_version()}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS))
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", help="write these results as JSON for later comparison")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown (default 0.15)")
+    args = parser.parse_args()
+
+    # Per-request SQL log lines would swamp the report.
+    logging.getLogger("app.sql").setLevel(logging.ERROR)
+    results = asyncio.run(run(args))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        baseline = saved["scenarios"]
+        if (saved["server"], saved["concurrency"]) != (args.server, args.concurrency):
+            print(f"note: baseline was taken with --server {saved['server']} --concurrency {saved['concurrency']}")
+        if saved.get("machine") != machine():
+            print(f"note: baseline was taken on {saved.get('machine', 'an unrecorded machine')}, this is {machine()}")
+
+    print(f"{args.server}, {args.concurrency} clients, {args.seconds:g}s per scenario")
+    print(f"{'scenario':<16}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'requests':>10}{'errors':>8}"
+          + (f"{'base p95':>10}{'base req/s':>11}" if baseline else ""))
+    for name, r in results.items():
+        line = (f"{name:<16}{r['throughput']:>9.0f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                f"{r['requests']:>10}{r['errors']:>8}")
+        if name in baseline:
+            line += f"{baseline[name]['p95_ms']:>10.2f}{baseline[name]['throughput']:>11.0f}"
+        print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"server": args.server, "concurrency": args.concurrency, "machine": machine(),
+                       "scenarios": results}, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.save_baseline}")
+
+    regressions = compare(results, baseline, args.tolerance)
+    failed = [name for name, r in results.items() if r["errors"]]
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    for name in failed:
+        print(f"ERRORS in {name}: {results[name]['errors']} failed requests")
+    sys.exit(1 if regressions or failed else 0)
+
+
+if __name__ == "__main__":
+    main()
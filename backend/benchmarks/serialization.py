@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Cost of turning a product listing into JSON bytes, per pipeline.
+
+    orm+validate+json      ORM objects, response_model validation, jsonable_encoder
+                           and json.dumps (FastAPI before direct JSON dumping)
+    orm+validate+dump_json ORM objects, response_model validation, pydantic-core
+                           dump_json (FastAPI's current response_model path)
+    rows+orjson            selected columns as row tuples, dicts, orjson
+                           (app.serializers, used by the list routes)
+
+Fetch is the query plus building ORM objects or rows; serialize is everything
+after that.
+
+    cd backend && python benchmarks/serialization.py --products 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Base, create_engine_from_settings
+from app.models import Product
+from app.schemas import ProductResponse
+from app.serializers import as_dicts, select_fields
+
+products_adapter = TypeAdapter(list[ProductResponse])
+
+
+async def fetch_orm(db):
+    return (await db.execute(select(Product))).scalars().all()
+
+
+async def fetch_rows(db):
+    return await db.execute(select_fields(Product, ProductResponse))
+
+
+def validate_and_json(objs) -> bytes:
+    return json.dumps(jsonable_encoder(products_adapter.validate_python(objs))).encode()
+
+
+def validate_and_dump_json(objs) -> bytes:
+    return products_adapter.dump_json(products_adapter.validate_python(objs))
+
+
+def rows_to_orjson(result) -> bytes:
+    return orjson.dumps(as_dicts(result), option=orjson.OPT_NON_STR_KEYS)
+
+
+PIPELINES = [
+    ("orm+validate+json", fetch_orm, validate_and_json),
+    ("orm+validate+dump_json", fetch_orm, validate_and_dump_json),
+    ("rows+orjson", fetch_rows, rows_to_orjson),
+]
+
+
+async def run(count: int, repeat: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        now = datetime.utcnow()
+        await conn.execute(insert(Product), [
+            {"name": f"Product {i}", "description": "A product description " * 4, "price": 9.99 + i % 50,
+             "stock": i % 40, "category": f"Category {i % 12}", "sku": f"SKU-{i:06d}", "brand": "Prodex",
+             "model": f"M-{i}", "image_url": f"https://cdn.example.com/p/{i}.jpg",
+             "thumbnail": f"https://cdn.example.com/p/{i}_200x.jpg", "gallery": "", "is_active": True,
+             "created_at": now, "updated_at": now}
+            for i in range(count)
+        ])
+
+    print(f"{count} products, median of {repeat} runs")
+    print(f"{'pipeline':<24}{'fetch ms':>10}{'serialize ms':>14}{'us/item':>10}{'total ms':>10}{'bytes':>11}")
+    for name, fetch, serialize in PIPELINES:
+        fetch_times, serialize_times = [], []
+        for _ in range(repeat):
+            async with engine.connect() as conn:
+                async with AsyncSession(conn) as db:
+                    started = time.perf_counter()
+                    data = await fetch(db)
+                    fetched = time.perf_counter()
+                    body = serialize(data)
+                    fetch_times.append(fetched - started)
+                    serialize_times.append(time.perf_counter() - fetched)
+        fetch_ms = statistics.median(fetch_times) * 1000
+        serialize_ms = statistics.median(serialize_times) * 1000
+        print(f"{name:<24}{fetch_ms:>10.1f}{serialize_ms:>14.1f}{serialize_ms * 1000 / count:>10.2f}"
+              f"{fetch_ms + serialize_ms:>10.1f}{len(body):>11}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.products, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
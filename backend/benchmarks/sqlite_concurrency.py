@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Read/write concurrency on SQLite with and without the engine's connect-time
+pragmas (WAL, synchronous=NORMAL, mmap, cache, busy_timeout).
+
+A writer inserts orders one transaction at a time while several readers page
+through the newest orders. Default rollback journaling makes readers wait for
+every commit; WAL lets them read the last committed snapshot instead.
+
+    cd backend && python benchmarks/sqlite_concurrency.py --seconds 5 --readers 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import select, insert
+from app.database import Base, create_engine_from_settings
+from app.models import Order
+
+
+async def run(tuned: bool, seconds: float, readers: int, seed_rows: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{path}", tune_sqlite=tuned)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Order), [
+            {"order_number": f"SEED-{i}", "customer_name": "Seed", "total_amount": i % 100, "created_at": datetime.utcnow()}
+            for i in range(seed_rows)
+        ])
+
+    deadline = time.perf_counter() + seconds
+    reads, write_latencies, errors = [0], [], [0]
+
+    async def writer():
+        n = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(insert(Order).values(
+                        order_number=f"W-{n}", customer_name="Bench", total_amount=10.0
+                    ))
+                write_latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors[0] += 1
+            n += 1
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(
+                        select(Order.id, Order.total_amount).order_by(Order.created_at.desc()).limit(50)
+                    )
+                reads[0] += 1
+            except Exception:
+                errors[0] += 1
+
+    await asyncio.gather(writer(), *[reader() for _ in range(readers)])
+    await engine.dispose()
+    return {
+        "reads_per_sec": reads[0] / seconds,
+        "writes_per_sec": len(write_latencies) / seconds,
+        "write_p50_ms": statistics.median(write_latencies) * 1000 if write_latencies else 0,
+        "errors": errors[0],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    for label, tuned in (("default journal", False), ("WAL + pragmas", True)):
+        result = await run(tuned, args.seconds, args.readers, args.seed_rows)
+        print(
+            f"{label:16} reads/s {result['reads_per_sec']:8.0f}  writes/s {result['writes_per_sec']:7.0f}  "
+            f"write p50 {result['write_p50_ms']:6.2f} ms  errors {result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
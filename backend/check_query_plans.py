@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Run every API route against a seeded scratch SQLite database, capture each SQL
+statement it issues, and run it through EXPLAIN QUERY PLAN. Exits non-zero if
+any statement scans a whole table instead of using an index.
+
+    cd backend && python check_query_plans.py
+"""
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "plans.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "database")
+# Background snapshot rebuilds would be attributed to whichever route is running;
+# without them GET /products takes its database path, which is what needs checking.
+os.environ["CATALOG_SNAPSHOTS"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.auth import create_access_token
+from app.database import Base, engine, read_engine
+from app.main import app
+
+# Listings that return an entire table by design; everything else must be indexed.
+ALLOWED_FULL_SCANS = {
+    "GET /users": {"users"},
+    "GET /products": {"products"},
+    "GET /categories": {"categories"},
+    "GET /customers": {"customers"},
+    "POST /products/bulk": {"categories"},
+}
+
+SKIP = re.compile(r"^\s*(INSERT|PRAGMA|CREATE|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b|sqlite_master|schema_migrations", re.I)
+BARE_SCAN = re.compile(r"^SCAN (\w+)$")
+
+captured = []
+current = {"route": None}
+
+
+def capture(conn, cursor, statement, parameters, context, executemany):
+    if current["route"] and not SKIP.search(statement):
+        params = parameters[0] if executemany and parameters else parameters
+        captured.append((current["route"], statement, params))
+
+
+for target in {engine, read_engine}:
+    event.listen(target.sync_engine, "before_cursor_execute", capture)
+
+
+def current_label(method, path, label):
+    return label or f"{method} {path}"
+
+
+def call(client, method, path, label=None, **kwargs):
+    current["route"] = current_label(method, path, label)
+    response = client.request(method, path, **kwargs)
+    current["route"] = None
+    if response.status_code >= 500:
+        print(f"warning: {current_label(method, path, label)} returned {response.status_code}")
+    return response
+
+
+def exercise(c: TestClient):
+    admin = {"email": "admin@example.com", "username": "admin", "password": "pw", "full_name": "Admin"}
+    call(c, "POST", "/users", json=admin)
+    as_admin = {"Authorization": "Bearer " + create_access_token({"sub": admin["email"], "user_id": 1, "type": "admin"})}
+    call(c, "GET", "/users")
+    call(c, "POST", "/users/import", content=b'{"email": "u2@example.com", "username": "u2", "password": "pw"}',
+         headers=as_admin)
+
+    call(c, "POST", "/categories", json={"name": "Notebooks"})
+    call(c, "GET", "/categories")
+    call(c, "GET", "/categories/1", "GET /categories/{id}")
+    call(c, "PUT", "/categories/1", "PUT /categories/{id}", json={"name": "Notebooks", "description": "d"})
+    call(c, "PATCH", "/categories/1", "PATCH /categories/{id}", json={"description": "e"})
+
+    for i in range(20):
+        call(c, "POST", "/products", json={"name": f"P{i}", "price": 10 + i, "sku": f"SKU-{i}", "category": "Notebooks"})
+    call(c, "GET", "/products")
+    call(c, "GET", "/products?category=Notebooks", "GET /products?category")
+    call(c, "POST", "/products/bulk", content=b'{"name": "Bulk", "price": 3, "sku": "SKU-0", "category": "Pens"}\n',
+         headers=as_admin)
+    call(c, "GET", "/products/1", "GET /products/{id}")
+    call(c, "PUT", "/products/1", "PUT /products/{id}", json={"name": "P0", "price": 9, "sku": "SKU-0"})
+    call(c, "PATCH", "/products/1", "PATCH /products/{id}", json={"stock": 5})
+
+    for i in range(20):
+        call(c, "POST", "/orders", json={
+            "order_number": f"ORD-{i}", "customer_name": "C", "customer_email": "c@example.com",
+            "total_amount": 20, "items": [{"product_id": 1 + i % 5, "quantity": 1}],
+        })
+    call(c, "GET", "/orders")
+    call(c, "GET", "/orders?status=pending&limit=5", "GET /orders?status")
+    call(c, "GET", "/orders?email=c@example.com", "GET /orders?email")
+    call(c, "GET", "/orders?order_number=ORD-3", "GET /orders?order_number")
+    cursor = call(c, "GET", "/orders?limit=5", "GET /orders?limit").headers.get("x-next-cursor")
+    call(c, "GET", f"/orders?limit=5&cursor={cursor}", "GET /orders?cursor")
+    call(c, "GET", "/orders/1", "GET /orders/{id}")
+    call(c, "PUT", "/orders/1", "PUT /orders/{id}", json={"order_number": "ORD-0", "customer_name": "C", "total_amount": 25})
+    call(c, "PATCH", "/orders/2", "PATCH /orders/{id}", json={"status": "processing"})
+    call(c, "PATCH", "/orders/bulk-status", json={"status": "shipped", "ids": [3, 4, 5]}, headers=as_admin)
+    call(c, "PATCH", "/orders/bulk-status", "PATCH /orders/bulk-status (filter)",
+         json={"status": "shipped", "filter": {"status": "pending"}}, headers=as_admin)
+    call(c, "DELETE", "/orders/20", "DELETE /orders/{id}")
+
+    call(c, "GET", "/dashboard/stats")
+    call(c, "GET", "/analytics/revenue?granularity=day&status=shipped")
+    call(c, "GET", "/analytics/top-products?window=30")
+
+    call(c, "POST", "/customers/import", content=b'{"email": "c2@example.com", "username": "c2", "password": "pw"}',
+         headers=as_admin)
+    call(c, "GET", "/customers")
+    call(c, "GET", "/customers/1", "GET /customers/{id}")
+    call(c, "PUT", "/customers/1", "PUT /customers/{id}", json={"email": "cust@example.com", "username": "cust"})
+    call(c, "PATCH", "/customers/1", "PATCH /customers/{id}", json={"city": "Seoul"})
+
+    call(c, "POST", "/auth/register", json={"email": "shopper@example.com", "username": "shopper", "password": "pw"})
+    login = call(c, "POST", "/auth/login", json={"email": "shopper@example.com", "password": "pw"}).json()
+    auth = {"Authorization": f"Bearer {login['access_token']}"}
+    call(c, "GET", "/auth/me", headers=auth)
+    call(c, "PUT", "/auth/profile", headers=auth, json={"name": "Shopper"})
+    refreshed = call(c, "POST", "/auth/refresh", json={"refresh_token": login["refresh_token"]}).json()
+    call(c, "POST", "/auth/forgot-password", json={"email": "shopper@example.com"})
+    call(c, "POST", "/auth/reset-password", json={"token": "unknown", "new_password": "pw2"})
+    call(c, "POST", "/auth/verify-email", json={"token": "unknown"})
+    call(c, "POST", "/auth/logout", json={"refresh_token": refreshed["refresh_token"]})
+    call(c, "POST", "/auth/logout-all", headers=auth)
+    call(c, "POST", "/auth/admin/login", json={"email": "admin@example.com", "password": "pw"})
+
+    cart = {"session_id": "plan-check"}
+    call(c, "POST", "/cart/add", json={"product_id": 2, "quantity": 1, **cart})
+    call(c, "POST", "/cart/add", "POST /cart/add (existing item)", json={"product_id": 2, "quantity": 1, **cart})
+    call(c, "GET", "/cart", params=cart)
+    call(c, "PUT", "/cart/item/1", "PUT /cart/item/{id}", params=cart, json={"quantity": 3})
+    call(c, "DELETE", "/cart/item/1", "DELETE /cart/item/{id}", params=cart)
+    call(c, "DELETE", "/cart/clear", params=cart)
+
+    call(c, "PUT", "/settings/store_name", "PUT /settings/{key}", params={"value": "Prodex"})
+    call(c, "GET", "/settings")
+
+    call(c, "DELETE", "/products/20", "DELETE /products/{id}")
+    call(c, "DELETE", "/categories/1", "DELETE /categories/{id}")
+    call(c, "DELETE", "/customers/1", "DELETE /customers/{id}")
+
+
+def full_scans(conn, statement, params) -> set[str]:
+    tables = set(Base.metadata.tables)
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}", params or ()).fetchall()
+    return {m.group(1) for *_, detail in plan if (m := BARE_SCAN.match(detail)) and m.group(1) in tables}
+
+
+def main() -> int:
+    with TestClient(app, raise_server_exceptions=False) as client:
+        exercise(client)
+
+    failures = []
+    routes = set()
+    conn = sqlite3.connect(DB_PATH)
+    for route, statement, params in captured:
+        routes.add(route)
+        scanned = full_scans(conn, statement, params) - ALLOWED_FULL_SCANS.get(route, set())
+        if scanned:
+            failures.append((route, ", ".join(sorted(scanned)), " ".join(statement.split())))
+    conn.close()
+
+    print(f"Checked {len(captured)} statements from {len(routes)} routes")
+    for route, tables, statement in failures:
+        print(f"FULL SCAN of {tables} in {route}:\n    {statement}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 import asyncio
+from sqlalchemy import select
 from app.database import async_session, init_db
-from app.models import Product, Category
+from app.importers import add_categories, import_products, iter_objects
+from app.models import Category
 
 LG_PRODUCTS = [
     # Refrigerators
@@ -55,20 +57,15 @@ CATEGORIES = [
 async def load_products():
     await init_db()
     async with async_session() as session:
-        # Add categories
-        for cat_data in CATEGORIES:
-            category = Category(name=cat_data["name"], description=cat_data["description"])
-            session.add(category)
-        
+        result = await session.execute(select(Category.name))
+        await add_categories(session, {c["name"]: c["description"] for c in CATEGORIES}, set(result.scalars().all()))
         await session.commit()
-        
-        # Add products
-        for prod_data in LG_PRODUCTS:
-            product = Product(**prod_data)
-            session.add(product)
-        
-        await session.commit()
-        print(f"Added {len(CATEGORIES)} categories and {len(LG_PRODUCTS)} products!")
+
+        # The LG feed has no SKUs; the model number is unique per product.
+        report = await import_products(session, iter_objects([{**p, "sku": p["model"]} for p in LG_PRODUCTS]))
+        for error in report["errors"]:
+            print(f"product {error['line']}: {error['error']}")
+        print(f"Added {len(CATEGORIES)} categories and {report['upserted']} products!")
 
 if __name__ == "__main__":
     asyncio.run(load_products())
@@ -1,39 +1,7 @@
+#!/usr/bin/env python3
 import asyncio
-import sys
-sys.path.insert(0, '.')
-
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, delete
-from datetime import datetime
-
-Base = declarative_base()
-
-
-class Product(Base):
-    __tablename__ = "products"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
-    description = Column(String(2000))
-    price = Column(Float, nullable=False)
-    stock = Column(Integer, default=0)
-    category = Column(String(100))
-    sku = Column(String(100), unique=True)
-    brand = Column(String(100))
-    model = Column(String(100))
-    image_url = Column(String(500))
-    thumbnail = Column(String(500))
-    gallery = Column(String(2000))
-    specifications = Column(String(2000))
-    features = Column(String(2000))
-    is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-
-
-engine = create_async_engine("mysql+aiomysql://root:@localhost/prodex", echo=False)
-async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+from app.database import async_session, init_db
+from app.importers import import_products, iter_objects
 
 NOTEBOOK_THERAPY_PRODUCTS = [
     {
@@ -505,38 +473,13 @@ NOTEBOOK_THERAPY_PRODUCTS = [
 
 
 async def load_products():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    
-    async with async_session() as session:
-        await session.execute(delete(Product))
-        await session.commit()
-
-        all_products = []
-        for cat_data in NOTEBOOK_THERAPY_PRODUCTS:
-            category = cat_data["category"]
-            for prod in cat_data["products"]:
-                product = Product(
-                    name=prod["name"],
-                    description=prod["description"],
-                    price=prod["price"],
-                    stock=prod["stock"],
-                    category=category,
-                    sku=prod["sku"],
-                    brand=prod["brand"],
-                    model=prod["model"],
-                    image_url=prod["image_url"],
-                    thumbnail=prod["thumbnail"],
-                    gallery=prod.get("gallery", ""),
-                    features=prod.get("features", ""),
-                    specifications=prod.get("specifications", ""),
-                    is_active=True
-                )
-                all_products.append(product)
-
-        session.add_all(all_products)
-        await session.commit()
-        print(f"Loaded {len(all_products)} NotebookTherapy products successfully!")
+    await init_db()
+    rows = [{**prod, "category": cat_data["category"]} for cat_data in NOTEBOOK_THERAPY_PRODUCTS for prod in cat_data["products"]]
+    async with async_session() as db:
+        report = await import_products(db, iter_objects(rows))
+    for error in report["errors"]:
+        print(f"product {error['line']}: {error['error']}")
+    print(f"Loaded {report['upserted']} NotebookTherapy products successfully!")
 
 
 if __name__ == "__main__":
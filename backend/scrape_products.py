@@ -2,124 +2,532 @@
 """
 Script to scrape fresh product data from NotebookTherapy using Playwright
 and update the database with correct Shopify CDN image URLs.
+
+By default pages are fetched over plain HTTP with one pooled client: product
+data comes from the Shopify `/products/<handle>.json` endpoint, or from the
+page's JSON-LD when that is missing. Only when neither yields a product (or a
+collection page lists no links) is the page rendered in headless Chromium,
+through a bounded pool of browser contexts that skips images, fonts and CSS.
+`--mode browser` renders every page. Browser pages wait for the elements they
+read instead of sleeping, and transient failures are retried with exponential
+backoff.
+
+Each scraped product is hashed and compared with the hash stored in
+scrape_state by the previous crawl. Only new and changed products are upserted
+into `products` by SKU, so a refresh writes just the delta and the catalog is
+never emptied. Stock is only set for products the crawler has not seen before,
+so a refresh never resets inventory.
+
+    python scrape_products.py --concurrency 8
+    python scrape_products.py --mode browser
+    python scrape_products.py --dry-run        # report changes without writing
+    python scrape_products.py --fixtures fixtures/notebooktherapy   # offline, against a local stand-in
 """
+import argparse
 import asyncio
+import functools
+import hashlib
+import html
+import json
+import os
+import random
 import re
-from playwright.async_api import async_playwright
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin, urlsplit
+import httpx
+from playwright.async_api import Error as PlaywrightError, async_playwright
+from sqlalchemy import select, update
+from app.database import async_session, init_db, upsert
+from app.importers import import_products, iter_objects
+from app.models import ScrapeState
 
-async def scrape_notebooktherapy():
-    """Scrape products from NotebookTherapy website"""
-    
-    categories = [
-        ("Bullet Journals", "https://notebooktherapy.com/collections/bullet-journal"),
-        ("Notebooks", "https://notebooktherapy.com/collections/all-notebooks"),
-        ("Washi Tape", "https://notebooktherapy.com/collections/washi-tape"),
-        ("Stickers", "https://notebooktherapy.com/collections/stickers"),
-        ("Stamps", "https://notebooktherapy.com/collections/stamps"),
-        ("Bags", "https://notebooktherapy.com/collections/bags"),
-        ("Pens", "https://notebooktherapy.com/collections/pens"),
-        ("Pencil Cases", "https://notebooktherapy.com/collections/pencil-cases"),
-        ("Accessories", "https://notebooktherapy.com/collections/accessories"),
-    ]
-    
-    all_products = []
-    
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        
-        for category_name, category_url in categories:
-            print(f"\n=== Scraping {category_name} ===")
-            
-            page = await browser.new_page()
-            await page.goto(category_url)
-            await page.wait_for_timeout(3000)
-            
-            # Get product links
-            product_links = await page.evaluate('''() => {
-                const links = document.querySelectorAll('a[href*="/products/"]');
-                const urls = new Set();
-                links.forEach(link => {
-                    const href = link.href;
-                    if (href.includes('/products/') && !href.includes('variant=')) {
-                        urls.add(href);
-                    }
-                });
-                return Array.from(urls);
-            }''')
-            
-            print(f"Found {len(product_links)} product links")
-            
-            # Process each product (limit to first 5 per category for speed)
-            for i, product_url in enumerate(product_links[:5]):
-                print(f"  Processing product {i+1}: {product_url}")
-                
-                product_page = await browser.new_page()
+BASE_URL = "https://notebooktherapy.com"
+
+CATEGORIES = [
+    ("Bullet Journals", "/collections/bullet-journal"),
+    ("Notebooks", "/collections/all-notebooks"),
+    ("Washi Tape", "/collections/washi-tape"),
+    ("Stickers", "/collections/stickers"),
+    ("Stamps", "/collections/stamps"),
+    ("Bags", "/collections/bags"),
+    ("Pens", "/collections/pens"),
+    ("Pencil Cases", "/collections/pencil-cases"),
+    ("Accessories", "/collections/accessories"),
+]
+
+USER_AGENT = "Mozilla/5.0 (compatible; ProdexCatalogBot/1.0)"
+
+PRODUCT_LINK_SELECTOR = 'a[href*="/products/"]'
+
+BLOCKED_RESOURCE_TYPES = {"image", "font", "stylesheet", "media"}
+
+JSON_LD_PATTERN = re.compile(r'<script[^>]+type="application/ld\+json"[^>]*>(.*?)</script>', re.S | re.I)
+
+PRODUCT_LINKS_JS = '''() => {
+    const links = document.querySelectorAll('a[href*="/products/"]');
+    const urls = new Set();
+    links.forEach(link => {
+        const href = link.href.split('#')[0];
+        if (href.includes('/products/') && !href.includes('variant=')) {
+            urls.add(href);
+        }
+    });
+    return Array.from(urls);
+}'''
+
+PRODUCT_DATA_JS = '''() => {
+    const getText = (sel) => document.querySelector(sel)?.textContent?.trim() || '';
+
+    // Get all images from the page
+    const images = [];
+    const imgEls = document.querySelectorAll('img[src*="cdn.shopify.com"]');
+    imgEls.forEach(img => {
+        const src = img.src;
+        // Get higher resolution by removing size params
+        const highRes = src.replace(/_\\d+x\\d+/g, '').split('?')[0];
+        if (!images.includes(highRes)) {
+            images.push(highRes);
+        }
+    });
+
+    return {
+        title: getText('h1') || getText('[class*="title"]'),
+        price: getText('[class*="price"]'),
+        description: getText('[class*="description"]') || getText('[id*="description"]'),
+        images: images.slice(0, 6) // Limit to 6 images
+    };
+}'''
+
+
+@dataclass
+class ScrapeConfig:
+    base_url: str = BASE_URL
+    mode: str = "http"  # "http" tries structured data first; "browser" renders every page
+    concurrency: int = 4
+    max_products: int | None = None  # per category; None scrapes every product
+    retries: int = 3
+    backoff_seconds: float = 1.0
+    timeout_ms: int = 15000
+
+
+class ContextPool:
+    """Up to `size` browser contexts shared by all page tasks. A context is
+    created on first use and handed back for reuse once its task finishes.
+    Images, fonts, stylesheets and media are never downloaded: extraction
+    only reads the DOM."""
+
+    def __init__(self, browser, size: int):
+        self.browser = browser
+        self.semaphore = asyncio.Semaphore(size)
+        self.idle = []
+        self.contexts = []
+
+    @asynccontextmanager
+    async def page(self, timeout_ms: int):
+        async with self.semaphore:
+            if self.idle:
+                context = self.idle.pop()
+            else:
+                context = await self.browser.new_context()
+                context.set_default_timeout(timeout_ms)
+                await context.route("**/*", block_heavy_resources)
+                self.contexts.append(context)
+            page = await context.new_page()
+            try:
+                yield page
+            finally:
+                await page.close()
+                self.idle.append(context)
+
+    async def close(self):
+        for context in self.contexts:
+            await context.close()
+
+
+async def block_heavy_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class LazyBrowser:
+    """Starts Playwright and Chromium the first time a page is needed, so an
+    HTTP-only crawl never pays for a browser."""
+
+    def __init__(self, config: "ScrapeConfig"):
+        self.config = config
+        self.lock = asyncio.Lock()
+        self.playwright = None
+        self.browser = None
+        self.pool = None
+
+    @asynccontextmanager
+    async def page(self):
+        async with self.lock:
+            if self.pool is None:
+                playwright = await async_playwright().start()
                 try:
-                    await product_page.goto(product_url)
-                    await product_page.wait_for_timeout(2000)
-                    
-                    # Extract product data
-                    product_data = await product_page.evaluate('''() => {
-                        const getText = (sel) => document.querySelector(sel)?.textContent?.trim() || '';
-                        
-                        // Get all images from the page
-                        const images = [];
-                        const imgEls = document.querySelectorAll('img[src*="cdn.shopify.com"]');
-                        imgEls.forEach(img => {
-                            const src = img.src;
-                            // Get higher resolution by removing size params
-                            const highRes = src.replace(/_\\d+x\\d+/g, '').split('?')[0];
-                            if (!images.includes(highRes)) {
-                                images.push(highRes);
-                            }
-                        });
-                        
-                        return {
-                            title: getText('h1') || getText('[class*="title"]'),
-                            price: getText('[class*="price"]'),
-                            description: getText('[class*="description"]') || getText('[id*="description"]'),
-                            images: images.slice(0, 6) // Limit to 6 images
-                        };
-                    }''')
-                    
-                    if product_data['title'] and product_data['images']:
-                        # Parse price
-                        price_match = re.search(r'[\d,]+\.?\d*', product_data['price'] or '')
-                        price = float(price_match.group().replace(',', '')) if price_match else 0
-                        
-                        product = {
-                            'name': product_data['title'],
-                            'price': price,
-                            'description': product_data['description'] or '',
-                            'category': category_name,
-                            'image_url': product_data['images'][0] if product_data['images'] else '',
-                            'thumbnail': product_data['images'][0] if product_data['images'] else '',
-                            'gallery': ','.join(product_data['images']) if product_data['images'] else '',
-                            'sku': f'NT-{category_name[:3].upper()}-{len(all_products)+1:04d}',
-                            'brand': 'NotebookTherapy',
-                            'stock': 100
-                        }
-                        
-                        all_products.append(product)
-                        print(f"    ✓ {product['name'][:50]}... - ${price}")
-                    
-                except Exception as e:
-                    print(f"    ✗ Error: {e}")
-                finally:
-                    await product_page.close()
-            
-            await page.close()
-        
-        await browser.close()
-    
-    return all_products
+                    browser = await playwright.chromium.launch(headless=True)
+                except PlaywrightError:
+                    await playwright.stop()
+                    raise
+                self.playwright, self.browser = playwright, browser
+                self.pool = ContextPool(browser, self.config.concurrency)
+        async with self.pool.page(self.config.timeout_ms) as page:
+            yield page
 
-if __name__ == "__main__":
-    products = asyncio.run(scrape_notebooktherapy())
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            await self.browser.close()
+            await self.playwright.stop()
+
+
+class RetryableStatus(Exception):
+    pass
+
+
+RETRYABLE_ERRORS = (PlaywrightError, httpx.TransportError, RetryableStatus)
+
+
+def error_message(e: BaseException) -> str:
+    # Some errors (httpx.PoolTimeout() among them) carry no message at all.
+    return (str(e) or type(e).__name__).splitlines()[0]
+
+
+async def with_retries(fn, config: ScrapeConfig, label: str):
+    """Run `fn()` and retry transient failures with exponential backoff and jitter."""
+    for attempt in range(config.retries + 1):
+        try:
+            return await fn()
+        except RETRYABLE_ERRORS as e:
+            if attempt == config.retries:
+                raise
+            delay = config.backoff_seconds * 2 ** attempt * random.uniform(0.5, 1.5)
+            print(f"    ! {label}: {error_message(e)} (retrying in {delay:.1f}s)")
+            await asyncio.sleep(delay)
+
+
+async def fetch(client: httpx.AsyncClient, url: str) -> httpx.Response | None:
+    """GET `url`; None for a 4xx, RetryableStatus for 429 and 5xx."""
+    response = await client.get(url)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableStatus(f"HTTP {response.status_code} from {url}")
+    return response if response.is_success else None
+
+
+def product_handle(url: str) -> str:
+    return urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+def full_size_image(src: str) -> str:
+    # Get higher resolution by removing size params
+    return re.sub(r"_\d+x\d+", "", src).split("?")[0]
+
+
+def html_to_text(fragment: str) -> str:
+    return " ".join(html.unescape(re.sub(r"<[^>]+>", " ", fragment or "")).split())
+
+
+def parse_product(product_data: dict, url: str, category_name: str) -> dict | None:
+    images = list(dict.fromkeys(full_size_image(src) for src in product_data["images"] if src))[:6]
+    if not (product_data["title"] and images):
+        return None
+    # Parse price
+    price_match = re.search(r'[\d,]+\.?\d*', str(product_data['price'] or ''))
+    price = float(price_match.group().replace(',', '')) if price_match else 0
+    return {
+        'name': product_data['title'],
+        'price': price,
+        'description': product_data['description'] or '',
+        'category': category_name,
+        'image_url': images[0],
+        'thumbnail': images[0],
+        'gallery': ','.join(images),
+        # Derived from the product handle so it is stable between crawls.
+        'sku': f'NT-{product_handle(url)}'[:100],
+        'brand': 'NotebookTherapy',
+        'stock': 100,
+        'url': url.split('?')[0],
+    }
+
+
+def product_links_from_html(page: str, page_url: str) -> list[str]:
+    links = {}
+    for href in re.findall(r'href="([^"]*/products/[^"]*)"', page):
+        href = html.unescape(href).split("#")[0]
+        if "variant=" not in href:
+            links[urljoin(page_url, href)] = None
+    return list(links)
+
+
+def product_from_shopify_json(data: dict) -> dict | None:
+    """Read /products/<handle>.json: {"product": {"title", "body_html", "variants", "images"}}."""
+    product = data.get("product") if isinstance(data, dict) else None
+    if not product:
+        return None
+    variants = product.get("variants") or [{}]
+    return {
+        "title": product.get("title", ""),
+        "price": variants[0].get("price", ""),
+        "description": html_to_text(product.get("body_html", "")),
+        "images": [image.get("src", "") for image in product.get("images") or []],
+    }
+
+
+def product_from_json_ld(page: str) -> dict | None:
+    """Read the schema.org Product embedded in a product page's JSON-LD."""
+    for block in JSON_LD_PATTERN.findall(page):
+        try:
+            data = json.loads(html.unescape(block))
+        except json.JSONDecodeError:
+            continue
+        for item in data if isinstance(data, list) else data.get("@graph", [data]):
+            if not isinstance(item, dict) or item.get("@type") != "Product":
+                continue
+            offers = item.get("offers") or {}
+            offer = offers[0] if isinstance(offers, list) and offers else offers
+            images = item.get("image") or []
+            images = images if isinstance(images, list) else [images]
+            return {
+                "title": item.get("name", ""),
+                "price": offer.get("price", "") if isinstance(offer, dict) else "",
+                "description": html_to_text(item.get("description", "")),
+                "images": [image.get("url", "") if isinstance(image, dict) else image for image in images],
+            }
+    return None
+
+
+async def http_category_links(client: httpx.AsyncClient, url: str) -> list[str]:
+    response = await fetch(client, url)
+    return product_links_from_html(response.text, str(response.url)) if response else []
+
+
+async def http_product(client: httpx.AsyncClient, url: str) -> dict | None:
+    """Product data from the storefront's JSON endpoint, else from the page's JSON-LD."""
+    base = url.split("?")[0].rstrip("/")
+    response = await fetch(client, base + ".json")
+    if response:
+        try:
+            data = product_from_shopify_json(response.json())
+        except ValueError:
+            data = None
+        if data:
+            return data
+    response = await fetch(client, base)
+    return product_from_json_ld(response.text) if response else None
+
+
+async def browser_category_links(browser: LazyBrowser, url: str) -> list[str]:
+    async with browser.page() as page:
+        await page.goto(url, wait_until="domcontentloaded")
+        await page.wait_for_selector(PRODUCT_LINK_SELECTOR, state="attached")
+        return await page.evaluate(PRODUCT_LINKS_JS)
+
+
+async def browser_product(browser: LazyBrowser, url: str) -> dict:
+    async with browser.page() as page:
+        await page.goto(url, wait_until="domcontentloaded")
+        await page.wait_for_selector("h1", state="attached")
+        return await page.evaluate(PRODUCT_DATA_JS)
+
+
+async def scrape_category(client, browser: LazyBrowser, config: ScrapeConfig, category_name: str, path: str) -> list[str]:
+    url = config.base_url + path
+    links = []
+    if config.mode == "http":
+        links = await with_retries(lambda: http_category_links(client, url), config, category_name)
+    if not links:
+        links = await with_retries(lambda: browser_category_links(browser, url), config, category_name)
+    print(f"=== {category_name}: found {len(links)} product links")
+    return links[:config.max_products] if config.max_products else links
+
+
+async def scrape_product(client, browser: LazyBrowser, config: ScrapeConfig, category_name: str, url: str) -> dict | None:
+    try:
+        data = None
+        if config.mode == "http":
+            data = await with_retries(lambda: http_product(client, url), config, url)
+        product = parse_product(data, url, category_name) if data else None
+        if product is None:
+            data = await with_retries(lambda: browser_product(browser, url), config, url)
+            product = parse_product(data, url, category_name)
+    except RETRYABLE_ERRORS as e:
+        print(f"    ✗ {url}: {error_message(e)}")
+        return None
+    if product:
+        print(f"    ✓ {product['name'][:50]}... - ${product['price']}")
+    return product
+
+
+async def bounded(slots: asyncio.Semaphore, job):
+    async with slots:
+        return await job
+
+
+async def scrape_notebooktherapy(config: ScrapeConfig | None = None):
+    """Scrape products from NotebookTherapy website"""
+    config = config or ScrapeConfig()
+    browser = LazyBrowser(config)
+    # At most `concurrency` jobs are in flight, so none sits queued on the
+    # connection pool while its request timeout runs down.
+    slots = asyncio.Semaphore(config.concurrency)
+    limits = httpx.Limits(max_connections=config.concurrency, max_keepalive_connections=config.concurrency)
+    timeout = httpx.Timeout(config.timeout_ms / 1000, pool=None)
+    async with httpx.AsyncClient(
+        limits=limits, timeout=timeout, follow_redirects=True, headers={"User-Agent": USER_AGENT}
+    ) as client:
+        try:
+            category_links = await asyncio.gather(*[
+                bounded(slots, scrape_category(client, browser, config, name, path)) for name, path in CATEGORIES
+            ], return_exceptions=True)
+
+            # A product listed in several collections is scraped once, under the first.
+            seen = set()
+            jobs = []
+            for (name, _), links in zip(CATEGORIES, category_links):
+                if isinstance(links, Exception):
+                    print(f"=== {name}: ✗ {error_message(links)}")
+                    continue
+                for url in links:
+                    if url not in seen:
+                        seen.add(url)
+                        jobs.append((url, bounded(slots, scrape_product(client, browser, config, name, url))))
+            # One product failing in an unexpected way must not abort the crawl.
+            results = await asyncio.gather(*[job for _, job in jobs], return_exceptions=True)
+        finally:
+            await browser.close()
+
+    products = []
+    for (url, _), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            print(f"    ✗ {url}: {error_message(result)}")
+        elif result:
+            products.append(result)
+    return products
+
+
+def content_hash(product: dict) -> str:
+    # The URL is left out: it follows from the SKU's handle and would otherwise
+    # change with the host being crawled.
+    fields = {k: v for k, v in product.items() if k != "url"}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+async def save_changes(products: list[dict], dry_run: bool = False) -> dict:
+    """Upsert new and changed products by SKU and record every product's hash in scrape_state."""
+    await init_db()
+    async with async_session() as db:
+        result = await db.execute(select(ScrapeState.sku, ScrapeState.content_hash))
+        known = dict(result.all())
+
+        hashes = {p["sku"]: content_hash(p) for p in products}
+        new = [p for p in products if p["sku"] not in known]
+        changed = [p for p in products if p["sku"] in known and hashes[p["sku"]] != known[p["sku"]]]
+        unchanged = [p["sku"] for p in products if known.get(p["sku"]) == hashes[p["sku"]]]
+        summary = {"new": len(new), "changed": len(changed), "unchanged": len(unchanged), "rejected": 0}
+        if dry_run:
+            return summary
+
+        rows = new + [{k: v for k, v in p.items() if k != "stock"} for p in changed]
+        report = await import_products(db, iter_objects(rows))
+        rejected = {rows[error["line"] - 1]["sku"] for error in report["errors"]}
+        for error in report["errors"]:
+            print(f"    ✗ {rows[error['line'] - 1]['url']}: {error['error']}")
+        summary["rejected"] = len(rejected)
+
+        now = datetime.utcnow()
+        written = [
+            {"sku": p["sku"], "url": p["url"], "content_hash": hashes[p["sku"]],
+             "first_seen_at": now, "last_seen_at": now, "changed_at": now}
+            for p in rows if p["sku"] not in rejected
+        ]
+        if written:
+            stmt = upsert(
+                db.bind.dialect.name, ScrapeState.__table__, keys=["sku"],
+                update=["url", "content_hash", "last_seen_at", "changed_at"],
+            )
+            await db.execute(stmt, written)
+        if unchanged:
+            await db.execute(update(ScrapeState).where(ScrapeState.sku.in_(unchanged)).values(last_seen_at=now))
+        await db.commit()
+    return summary
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Serves a directory the way a storefront lays out its URLs: extensionless
+    paths such as /products/<handle> are answered from <path>.html."""
+
+    def translate_path(self, path):
+        local = super().translate_path(path)
+        if not os.path.exists(local) and os.path.exists(local + ".html"):
+            return local + ".html"
+        return local
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory: str) -> tuple[ThreadingHTTPServer, str]:
+    """Start a stand-in storefront over `directory` on a free local port; returns the server and its base URL."""
+    handler = functools.partial(FixtureHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def parse_args(argv=None) -> tuple[argparse.Namespace, ScrapeConfig]:
+    parser = argparse.ArgumentParser(description="Scrape the NotebookTherapy catalog")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--fixtures", help="serve this directory locally and scrape it instead of --base-url")
+    parser.add_argument("--mode", choices=["http", "browser"], default=ScrapeConfig.mode)
+    parser.add_argument("--concurrency", type=int, default=ScrapeConfig.concurrency)
+    parser.add_argument("--limit", type=int, help="max products per category")
+    parser.add_argument("--retries", type=int, default=ScrapeConfig.retries)
+    parser.add_argument("--timeout-ms", type=int, default=ScrapeConfig.timeout_ms)
+    parser.add_argument("--dry-run", action="store_true", help="report new and changed products without writing them")
+    args = parser.parse_args(argv)
+    return args, ScrapeConfig(
+        base_url=args.base_url.rstrip("/"),
+        mode=args.mode,
+        concurrency=args.concurrency,
+        max_products=args.limit,
+        retries=args.retries,
+        timeout_ms=args.timeout_ms,
+    )
+
+
+async def crawl(config: ScrapeConfig, dry_run: bool) -> tuple[list[dict], dict]:
+    products = await scrape_notebooktherapy(config)
     print(f"\n=== Total products scraped: {len(products)} ===")
-    
+    return products, await save_changes(products, dry_run=dry_run)
+
+
+def main(argv=None):
+    args, config = parse_args(argv)
+    server = None
+    if args.fixtures:
+        server, config.base_url = serve_fixtures(args.fixtures)
+    try:
+        products, summary = asyncio.run(crawl(config, args.dry_run))
+    finally:
+        if server:
+            server.shutdown()
+
+    print(f"{summary['new']} new, {summary['changed']} changed, {summary['unchanged']} unchanged, "
+          f"{summary['rejected']} rejected{' (dry run, nothing written)' if args.dry_run else ''}")
+
     # Print first product as sample
     if products:
         print("\nSample product:")
         for k, v in products[0].items():
             print(f"  {k}: {str(v)[:80]}")
+
+
+if __name__ == "__main__":
+    main()
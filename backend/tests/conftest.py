@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+import pytest
+from fastapi.testclient import TestClient
+
+# The app builds its engines from DATABASE_URL at import time, so point it at a
+# scratch database before anything imports app.database.
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def client():
+    """A TestClient running the app's lifespan. The engines are disposed on the
+    app's loop before it closes, since pooled aiosqlite connections belong to it."""
+    from app.auth import create_access_token
+    from app.database import engine, read_engine
+    from app.main import app
+
+    with TestClient(app) as c:
+        c.admin_headers = {
+            "Authorization": "Bearer " + create_access_token({"sub": "admin@example.com", "user_id": 1, "type": "admin"})
+        }
+        yield c
+        c.portal.call(engine.dispose)
+        c.portal.call(read_engine.dispose)
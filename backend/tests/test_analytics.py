@@ -0,0 +1,98 @@
+"""The incrementally maintained analytics tables must match what the orders say."""
+from sqlalchemy import select
+from app.analytics import rebuild_product_sales, rebuild_rollups
+from app.database import async_session
+from app.models import OrderRollup, ProductSalesDaily
+
+
+def create_product(client, sku, price):
+    response = client.post("/products", json={"name": sku, "price": price, "sku": sku})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def create_order(client, number, items, status="pending", total=10):
+    response = client.post("/orders", json={
+        "order_number": number, "customer_name": "C", "total_amount": total, "status": status, "items": items,
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def units_sold(client, product_id):
+    ranking = client.get("/analytics/top-products", params={"window": 7, "limit": 100}).json()
+    return next((row["units"] for row in ranking if row["product"]["id"] == product_id), 0)
+
+
+def test_cancelled_orders_leave_the_sales_totals(client):
+    product = create_product(client, "SALES-CANCEL", 2.5)
+    first = create_order(client, "SALES-1", [{"product_id": product, "quantity": 3}])
+    second = create_order(client, "SALES-2", [{"product_id": product, "quantity": 2}])
+    assert units_sold(client, product) == 5
+
+    client.patch(f"/orders/{first}", json={"status": "cancelled"})
+    assert units_sold(client, product) == 2
+    client.patch(f"/orders/{first}", json={"status": "pending"})
+    assert units_sold(client, product) == 5
+
+    response = client.patch(
+        "/orders/bulk-status", json={"status": "cancelled", "ids": [first, second]}, headers=client.admin_headers
+    )
+    assert response.json()["updated"] == 2
+    assert units_sold(client, product) == 0
+
+    # Deleting a cancelled order must not subtract its items a second time.
+    client.delete(f"/orders/{first}")
+    create_order(client, "SALES-3", [{"product_id": product, "quantity": 4}])
+    assert units_sold(client, product) == 4
+
+    create_order(client, "SALES-4", [{"product_id": product, "quantity": 9}], status="cancelled")
+    assert units_sold(client, product) == 4
+
+
+def rollup_state(client):
+    """Non-empty rows of both analytics tables, comparable across a rebuild."""
+    async def read():
+        async with async_session() as db:
+            rollups = await db.execute(select(
+                OrderRollup.granularity, OrderRollup.bucket_start, OrderRollup.status,
+                OrderRollup.order_count, OrderRollup.revenue,
+            ))
+            sales = await db.execute(select(
+                ProductSalesDaily.day, ProductSalesDaily.product_id, ProductSalesDaily.units, ProductSalesDaily.revenue,
+            ))
+            return (
+                {(g, b, s): (count, round(revenue, 6)) for g, b, s, count, revenue in rollups if count or revenue},
+                {(day, p): (units, round(revenue, 6)) for day, p, units, revenue in sales if units or revenue},
+            )
+    return client.portal.call(read)
+
+
+def rebuild(client):
+    async def run():
+        async with async_session() as db:
+            await rebuild_rollups(db)
+            await rebuild_product_sales(db)
+    client.portal.call(run)
+
+
+def test_incremental_rollups_match_a_full_rebuild(client):
+    pen = create_product(client, "ROLLUP-PEN", 1.5)
+    pad = create_product(client, "ROLLUP-PAD", 4.0)
+    orders = [
+        create_order(client, f"ROLLUP-{i}", [{"product_id": pen, "quantity": i + 1}, {"product_id": pad, "quantity": 1}],
+                     total=10 + i)
+        for i in range(6)
+    ]
+    client.patch(f"/orders/{orders[0]}", json={"total_amount": 99})
+    client.patch(f"/orders/{orders[1]}", json={"status": "processing", "total_amount": 5})
+    client.put(f"/orders/{orders[2]}", json={"order_number": "ROLLUP-2", "customer_name": "C", "total_amount": 7,
+                                             "status": "cancelled"})
+    client.patch("/orders/bulk-status", json={"status": "shipped", "ids": orders[3:5]}, headers=client.admin_headers)
+    client.delete(f"/orders/{orders[5]}")
+    client.delete(f"/orders/{orders[2]}")
+
+    incremental = rollup_state(client)
+    assert incremental[0] and incremental[1]
+    rebuild(client)
+    assert rollup_state(client) == incremental
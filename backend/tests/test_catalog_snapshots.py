@@ -0,0 +1,40 @@
+"""GET /products must reflect writes made through the same worker at once,
+even though the snapshot rebuild is debounced."""
+import pytest
+from app.config import settings
+from app.snapshots import catalog_snapshots
+
+
+@pytest.fixture
+def slow_rebuilds(monkeypatch):
+    # Long enough that no rebuild can land while a test runs.
+    monkeypatch.setattr(settings, "SNAPSHOT_DEBOUNCE_SECONDS", 60)
+
+
+def listed(client, category=None):
+    # Drop the read-your-writes cookie: freshness must not depend on it.
+    client.cookies.clear()
+    params = {"category": category} if category else {}
+    return {p["sku"]: p for p in client.get("/products", params=params).json()}
+
+
+def test_listing_shows_writes_before_the_rebuild(slow_rebuilds, client):
+    assert catalog_snapshots.current is not None
+    created = client.post("/products", json={"name": "Snap", "price": 4.0, "sku": "SNAP-1", "category": "Snaps"})
+    assert created.status_code == 200
+    assert listed(client)["SNAP-1"]["price"] == 4.0
+    assert "SNAP-1" in listed(client, "Snaps")
+
+    client.patch(f"/products/{created.json()['id']}", json={"price": 5.5})
+    assert listed(client)["SNAP-1"]["price"] == 5.5
+
+    client.delete(f"/products/{created.json()['id']}")
+    assert "SNAP-1" not in listed(client)
+
+
+def test_snapshot_is_served_again_once_rebuilt(slow_rebuilds, client):
+    client.post("/products", json={"name": "Snap", "price": 4.0, "sku": "SNAP-2"})
+    assert catalog_snapshots.fresh() is None
+    client.portal.call(catalog_snapshots.rebuild)
+    assert catalog_snapshots.fresh() is catalog_snapshots.current
+    assert "SNAP-2" in listed(client)
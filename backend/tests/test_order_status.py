@@ -0,0 +1,31 @@
+"""PATCH /orders/bulk-status: admin only, and only legal transitions are applied."""
+from app.auth import create_access_token
+
+
+def create_order(client, number, status="pending"):
+    response = client.post(
+        "/orders", json={"order_number": number, "customer_name": "C", "total_amount": 10, "status": status}
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_bulk_status_requires_an_admin(client):
+    order_id = create_order(client, "BULK-ANON")
+    body = {"status": "cancelled", "ids": [order_id]}
+    assert client.patch("/orders/bulk-status", json=body).status_code == 401
+
+    as_customer = {"Authorization": "Bearer " + create_access_token({"sub": "c@example.com", "user_id": 1, "type": "customer"})}
+    assert client.patch("/orders/bulk-status", json=body, headers=as_customer).status_code == 403
+    assert client.get(f"/orders/{order_id}").json()["status"] == "pending"
+
+
+def test_bulk_status_applies_legal_transitions(client):
+    pending = create_order(client, "BULK-P")
+    delivered = create_order(client, "BULK-D", status="delivered")
+    response = client.patch(
+        "/orders/bulk-status", json={"status": "shipped", "ids": [pending, delivered]}, headers=client.admin_headers
+    )
+    assert response.json() == {"updated": 1, "skipped": 1, "by_status": {"pending": 1}}
+    assert client.get(f"/orders/{pending}").json()["status"] == "shipped"
+    assert client.get(f"/orders/{delivered}").json()["status"] == "delivered"
@@ -0,0 +1,35 @@
+"""Idle rate limit buckets are purged once they would have refilled anyway."""
+import asyncio
+import time
+from sqlalchemy import select
+from app.database import async_session
+from app.models import RateLimitBucket
+from app.ratelimit import DatabaseBackend, MemoryBackend, RateLimiter
+
+
+def test_database_buckets_are_purged_when_idle(client):
+    limiter = RateLimiter(DatabaseBackend())
+    refill = limiter.refill_seconds()
+
+    async def scenario():
+        now = time.time()
+        await limiter.backend.take("test:idle", 5, 1, now - refill - 1)
+        await limiter.backend.take("test:busy", 5, 1, now)
+        purged = await limiter.purge_idle()
+        async with async_session() as db:
+            keys = await db.scalars(select(RateLimitBucket.key).where(RateLimitBucket.key.like("test:%")))
+            return purged, sorted(keys)
+
+    assert client.portal.call(scenario) == (1, ["test:busy"])
+
+
+def test_memory_buckets_are_purged_when_idle():
+    backend = MemoryBackend()
+
+    async def scenario():
+        now = time.time()
+        await backend.take("old", 5, 1, now - 1000)
+        await backend.take("new", 5, 1, now)
+        return await backend.purge_idle(now - 500), list(backend._buckets)
+
+    assert asyncio.run(scenario()) == (1, ["new"])
@@ -0,0 +1,144 @@
+"""
+Offline crawls of the bundled NotebookTherapy fixture, served by FixtureHandler.
+The one product with neither a .json endpoint nor JSON-LD (accessories-2) goes
+to the browser fallback, which is stubbed so the tests need no Chromium.
+"""
+import asyncio
+import functools
+import json
+import os
+import shutil
+import threading
+import time
+from http.server import ThreadingHTTPServer
+import pytest
+from sqlalchemy import delete
+import scrape_products
+from app.database import async_session, engine, read_engine
+from app.models import Category, Product, ScrapeState
+from scrape_products import FixtureHandler, ScrapeConfig, crawl
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures", "notebooktherapy")
+PRODUCT_COUNT = 18
+
+
+class FlakyHandler(FixtureHandler):
+    """FixtureHandler that can fail or stall chosen paths, to exercise retries and timeouts."""
+
+    failures: dict[str, int] = {}  # path -> number of 503s to return first
+    stall: dict[str, float] = {}  # path -> seconds to wait before answering
+    requests: list[str] = []
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        self.requests.append(path)
+        if self.failures.get(path):
+            self.failures[path] -= 1
+            self.send_error(503)
+            return
+        if path in self.stall:
+            time.sleep(self.stall[path])
+        super().do_GET()
+
+
+@pytest.fixture
+def storefront(tmp_path):
+    """A copy of the fixture storefront on a local port; yields (directory, base_url)."""
+    directory = tmp_path / "store"
+    shutil.copytree(FIXTURES, directory)
+    FlakyHandler.failures, FlakyHandler.stall, FlakyHandler.requests = {}, {}, []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(FlakyHandler, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield directory, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def no_browser(monkeypatch):
+    async def browser_product(browser, url):
+        handle = scrape_products.product_handle(url)
+        return {"title": f"Rendered {handle}", "price": "$9.00", "description": "",
+                "images": [f"https://cdn.shopify.com/s/files/{handle}.jpg"]}
+
+    async def browser_category_links(browser, url):
+        return []
+
+    monkeypatch.setattr(scrape_products, "browser_product", browser_product)
+    monkeypatch.setattr(scrape_products, "browser_category_links", browser_category_links)
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+            await read_engine.dispose()
+    return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def empty_catalog():
+    async def clear():
+        async with async_session() as db:
+            for model in (ScrapeState, Product, Category):
+                await db.execute(delete(model))
+            await db.commit()
+
+    run(scrape_products.init_db())
+    run(clear())
+
+
+def config(base_url, **overrides) -> ScrapeConfig:
+    return ScrapeConfig(base_url=base_url, backoff_seconds=0.01, **overrides)
+
+
+def test_first_crawl_inserts_everything_and_repeat_changes_nothing(storefront):
+    _, base_url = storefront
+    products, summary = run(crawl(config(base_url), dry_run=False))
+    assert len(products) == PRODUCT_COUNT
+    assert summary == {"new": PRODUCT_COUNT, "changed": 0, "unchanged": 0, "rejected": 0}
+    assert "Rendered accessories-2" in {p["name"] for p in products}
+
+    _, summary = run(crawl(config(base_url), dry_run=False))
+    assert summary == {"new": 0, "changed": 0, "unchanged": PRODUCT_COUNT, "rejected": 0}
+
+
+def test_recrawl_writes_only_new_and_changed_products(storefront):
+    directory, base_url = storefront
+    run(crawl(config(base_url), dry_run=False))
+
+    product_json = directory / "products" / "pens-1.json"
+    data = json.loads(product_json.read_text())
+    data["product"]["variants"][0]["price"] = "21.00"
+    product_json.write_text(json.dumps(data))
+    shutil.copy(directory / "products" / "pens-1.json", directory / "products" / "pens-3.json")
+    collection = directory / "collections" / "pens.html"
+    collection.write_text(collection.read_text().replace("</body>", '<a href="/products/pens-3">Pens 3</a></body>'))
+
+    _, dry = run(crawl(config(base_url), dry_run=True))
+    assert dry == {"new": 1, "changed": 1, "unchanged": PRODUCT_COUNT - 1, "rejected": 0}
+    _, summary = run(crawl(config(base_url), dry_run=False))
+    assert summary == dry
+    _, summary = run(crawl(config(base_url), dry_run=False))
+    assert summary == {"new": 0, "changed": 0, "unchanged": PRODUCT_COUNT + 1, "rejected": 0}
+
+
+def test_transient_errors_are_retried(storefront):
+    _, base_url = storefront
+    FlakyHandler.failures = {"/products/pens-1.json": 2, "/collections/stamps": 1}
+    products, summary = run(crawl(config(base_url, retries=3), dry_run=True))
+    assert summary["new"] == PRODUCT_COUNT
+    assert FlakyHandler.requests.count("/products/pens-1.json") == 3
+    assert FlakyHandler.requests.count("/collections/stamps") == 2
+
+
+def test_exhausted_retries_and_timeouts_skip_only_the_failing_product(storefront):
+    _, base_url = storefront
+    FlakyHandler.failures = {"/products/pens-1.json": 10, "/products/pens-1": 10}
+    FlakyHandler.stall = {"/products/bags-1.json": 2.0, "/products/bags-1": 2.0}
+    products, summary = run(crawl(config(base_url, retries=1, timeout_ms=300), dry_run=True))
+    names = {p["name"] for p in products}
+    assert "Pens 1" not in names and "Bags 1" not in names
+    assert summary["new"] == PRODUCT_COUNT - 2
+    assert FlakyHandler.requests.count("/products/pens-1.json") == 2
@@ -0,0 +1,24 @@
+"""Workers pick up settings written by others, whatever the timestamps say."""
+from sqlalchemy import func, select, update
+from app.database import async_session
+from app.models import Setting
+from app.store_settings import StoreSettings
+
+
+def test_sync_sees_writes_with_an_older_updated_at(client):
+    writer, reader = StoreSettings(), StoreSettings()
+
+    async def scenario():
+        async with async_session() as db:
+            await writer.set(db, "tax_rate", "0.1")
+        await reader.load()
+        async with async_session() as db:
+            latest = await db.scalar(select(func.max(Setting.updated_at)))
+            await writer.set(db, "tax_rate", "0.25")
+            # As if committed by a host whose clock is behind: no newer timestamp.
+            await db.execute(update(Setting).values(updated_at=latest))
+            await db.commit()
+        await reader.sync()
+        return reader.get("tax_rate")
+
+    assert client.portal.call(scenario) == 0.25
@@ -1,4 +1,5 @@
 import { createContext, useContext, useState, useEffect, type ReactNode } from 'react';
+import { authApi, getStoredRefreshToken, setAuthToken } from '../services/api';
 
 interface Customer {
   id: number;
@@ -38,7 +39,12 @@ export function AuthProvider({ children }: { children: ReactNode }) {
   };
 
   const logout = () => {
-    localStorage.removeItem('token');
+    // Revoke the session server-side too; signing out locally must not wait on it.
+    const refreshToken = getStoredRefreshToken();
+    if (refreshToken) {
+      authApi.logout(refreshToken).catch(console.error);
+    }
+    setAuthToken(null);
     localStorage.removeItem('customer');
     setCustomer(null);
   };
@@ -63,6 +63,10 @@ export default function CheckoutPage() {
         customer_email: formData.email,
         total_amount: total,
         status: 'pending',
+        items: cart.map(item => ({
+          product_id: item.product.id,
+          quantity: item.quantity,
+        })),
       });
 
       cartApi.clearCart();
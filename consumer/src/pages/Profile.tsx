@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { getStoredToken, authApi } from '../services/api';
+import { useAuth } from '../context/AuthContext';
 
 interface Customer {
   id: number;
@@ -14,6 +15,7 @@ interface Customer {
 }
 
 export default function Profile() {
+  const { logout } = useAuth();
   const navigate = useNavigate();
   const [customer, setCustomer] = useState<Customer | null>(null);
   const [formData, setFormData] = useState({
@@ -73,8 +75,7 @@ export default function Profile() {
   };
 
   const handleLogout = () => {
-    localStorage.removeItem('token');
-    localStorage.removeItem('customer');
+    logout();
     navigate('/signin');
   };
 
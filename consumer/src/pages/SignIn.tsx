@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { Link, useNavigate, useLocation } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { authApi } from '../services/api';
+import { authApi, setAuthToken } from '../services/api';
 import type { LoginData } from '../services/api';
 
 export default function SignIn() {
@@ -28,7 +28,7 @@ export default function SignIn() {
     try {
       const res = await authApi.login(formData);
       localStorage.setItem('customer', JSON.stringify(res.data.customer));
-      localStorage.setItem('token', res.data.access_token);
+      setAuthToken(res.data.access_token, res.data.refresh_token);
       login({ 
         id: res.data.customer.id, 
         name: res.data.customer.name || '', 
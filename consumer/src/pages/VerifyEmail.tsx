@@ -0,0 +1,44 @@
+import { useState, useEffect, useRef } from 'react';
+import { useSearchParams, Link } from 'react-router-dom';
+import { authApi } from '../services/api';
+
+export default function VerifyEmail() {
+  const [searchParams] = useSearchParams();
+  const token = searchParams.get('token');
+  const [status, setStatus] = useState<'verifying' | 'verified' | 'failed'>(token ? 'verifying' : 'failed');
+  // The token is single-use, so the request must not run twice (StrictMode re-runs effects).
+  const sent = useRef(false);
+
+  useEffect(() => {
+    if (!token || sent.current) return;
+    sent.current = true;
+    authApi.verifyEmail(token)
+      .then(() => setStatus('verified'))
+      .catch(() => setStatus('failed'));
+  }, [token]);
+
+  return (
+    <div className="min-h-screen flex items-center justify-center bg-[#EBEBEE]">
+      <div className="bg-white rounded-xl shadow-lg p-8 w-full max-w-md text-center">
+        {status === 'verifying' && (
+          <p className="text-[#5B5A59]">Verifying your email...</p>
+        )}
+        {status === 'verified' && (
+          <>
+            <div className="text-green-500 text-5xl mb-4">✓</div>
+            <h1 className="text-2xl font-bold text-[#151515] mb-4">Email Verified</h1>
+            <p className="text-[#5B5A59] mb-4">Thanks for confirming your email address.</p>
+            <Link to="/signin" className="text-[#3D48E8] hover:underline">Go to Sign In</Link>
+          </>
+        )}
+        {status === 'failed' && (
+          <>
+            <h1 className="text-2xl font-bold text-[#151515] mb-4">Verification Failed</h1>
+            <p className="text-[#5B5A59] mb-4">This link is invalid or has expired.</p>
+            <Link to="/" className="text-[#3D48E8] hover:underline">Back to the store</Link>
+          </>
+        )}
+      </div>
+    </div>
+  );
+}
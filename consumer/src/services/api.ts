@@ -2,6 +2,7 @@ import axios from 'axios';
 
 const api = axios.create({
   baseURL: 'http://localhost:8000',
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
@@ -38,19 +39,29 @@ export interface LoginData {
 export interface Token {
   access_token: string;
   token_type: string;
+  refresh_token: string | null;
   customer: Customer;
 }
 
+export interface TokenPair {
+  access_token: string;
+  token_type: string;
+  refresh_token: string;
+}
+
 export const authApi = {
   register: (data: RegisterData) => api.post<Customer>('/auth/register', data),
   login: (data: LoginData) => api.post<Token>('/auth/login', data),
   forgotPassword: (email: string) => api.post('/auth/forgot-password', { email }),
   resetPassword: (token: string, new_password: string) => api.post('/auth/reset-password', { token, new_password }),
+  verifyEmail: (token: string) => api.post('/auth/verify-email', { token }),
   getMe: (token: string) => api.get<Customer>('/auth/me', { headers: { Authorization: `Bearer ${token}` } }),
+  refresh: (refresh_token: string) => api.post<TokenPair>('/auth/refresh', { refresh_token }),
+  logout: (refresh_token: string) => api.post('/auth/logout', { refresh_token }),
   updateProfile: (token: string, data: Partial<Customer>) => api.put<Customer>('/auth/profile', data, { headers: { Authorization: `Bearer ${token}` } }),
 };
 
-export const setAuthToken = (token: string | null) => {
+export const setAuthToken = (token: string | null, refreshToken?: string | null) => {
   if (token) {
     api.defaults.headers.common['Authorization'] = `Bearer ${token}`;
     localStorage.setItem('token', token);
@@ -58,9 +69,58 @@ export const setAuthToken = (token: string | null) => {
     delete api.defaults.headers.common['Authorization'];
     localStorage.removeItem('token');
   }
+  if (refreshToken) {
+    localStorage.setItem('refresh_token', refreshToken);
+  } else if (refreshToken === null || !token) {
+    localStorage.removeItem('refresh_token');
+  }
 };
 
 export const getStoredToken = () => localStorage.getItem('token');
+export const getStoredRefreshToken = () => localStorage.getItem('refresh_token');
+
+if (getStoredToken()) {
+  api.defaults.headers.common['Authorization'] = `Bearer ${getStoredToken()}`;
+}
+
+// Access tokens are short-lived. On a 401 the refresh token is exchanged for a
+// new pair (once, shared by concurrent requests) and the request is retried.
+// If that fails the session is over and the stored tokens are dropped.
+let refreshing: Promise<string | null> | null = null;
+
+const refreshAccessToken = (): Promise<string | null> => {
+  const refreshToken = getStoredRefreshToken();
+  if (!refreshToken) return Promise.resolve(null);
+  if (!refreshing) {
+    refreshing = authApi.refresh(refreshToken)
+      .then((res) => {
+        setAuthToken(res.data.access_token, res.data.refresh_token);
+        return res.data.access_token;
+      })
+      .catch(() => {
+        setAuthToken(null);
+        localStorage.removeItem('customer');
+        return null;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+api.interceptors.response.use(undefined, async (error) => {
+  const config = error.config;
+  const isTokenCall = ['/auth/login', '/auth/refresh', '/auth/logout'].includes(config?.url);
+  if (error.response?.status !== 401 || !config || config._retried || isTokenCall) {
+    return Promise.reject(error);
+  }
+  const token = await refreshAccessToken();
+  if (!token) return Promise.reject(error);
+  config._retried = true;
+  config.headers.Authorization = `Bearer ${token}`;
+  return api(config);
+});
 
 export interface Product {
   id: number;
@@ -241,12 +301,18 @@ export interface Order {
   updated_at: string;
 }
 
+export interface OrderItemCreate {
+  product_id: number;
+  quantity: number;
+}
+
 export interface OrderCreate {
   order_number: string;
   customer_name: string;
   customer_email?: string;
   total_amount: number;
   status?: string;
+  items?: OrderItemCreate[];
 }
 
 export const orderApi = {
@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react';
-import { dashboardApi } from '../services/api';
+import { dashboardApi, nextCursor } from '../services/api';
 import type { Order, OrderFormData } from '../services/api';
 import GenericForm from '../components/GenericForm';
 
@@ -45,16 +45,33 @@ const StatusBadge = ({ status }: { status: string }) => {
 export default function Orders() {
   const [orders, setOrders] = useState<Order[]>([]);
   const [loading, setLoading] = useState(true);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showForm, setShowForm] = useState(false);
   const [editingOrder, setEditingOrder] = useState<Order | null>(null);
 
   const fetchOrders = () => {
     dashboardApi.getOrders()
-      .then((res) => setOrders(res.data))
+      .then((res) => {
+        setOrders(res.data);
+        setCursor(nextCursor(res));
+      })
       .catch(console.error)
       .finally(() => setLoading(false));
   };
 
+  const loadMore = () => {
+    if (!cursor) return;
+    setLoadingMore(true);
+    dashboardApi.getOrders({ cursor })
+      .then((res) => {
+        setOrders((prev) => [...prev, ...res.data]);
+        setCursor(nextCursor(res));
+      })
+      .catch(console.error)
+      .finally(() => setLoadingMore(false));
+  };
+
   useEffect(() => {
     fetchOrders();
   }, []);
@@ -160,6 +177,17 @@ export default function Orders() {
             )}
           </tbody>
         </table>
+        {cursor && (
+          <div className="px-6 py-4 border-t border-prodex-border text-center">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 text-prodex-primary hover:bg-prodex-bg-alt rounded-lg disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {showForm && (
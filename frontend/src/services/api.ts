@@ -1,12 +1,21 @@
 import axios from 'axios';
+import type { AxiosResponse } from 'axios';
 
 const api = axios.create({
   baseURL: 'http://localhost:8000',
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
 });
 
+// Admin-only routes (imports, bulk updates) need the token from AdminLogin.
+api.interceptors.request.use((config) => {
+  const token = localStorage.getItem('admin_token');
+  if (token) config.headers.Authorization = `Bearer ${token}`;
+  return config;
+});
+
 export interface DashboardStats {
   total_users: number;
   total_products: number;
@@ -62,6 +71,32 @@ export interface OrderFormData {
   status?: string;
 }
 
+export interface OrderFilters {
+  limit?: number;
+  cursor?: string;
+  status?: string;
+  date_from?: string;
+  date_to?: string;
+  email?: string;
+  order_number?: string;
+}
+
+// Cursor for the next page of a paginated listing, absent on the last page.
+export const nextCursor = (res: AxiosResponse): string | null =>
+  res.headers['x-next-cursor'] || null;
+
+export interface BulkStatusUpdate {
+  status: string;
+  ids?: number[];
+  filter?: Pick<OrderFilters, 'status' | 'date_from' | 'date_to' | 'email'>;
+}
+
+export interface BulkStatusResult {
+  updated: number;
+  skipped: number;
+  by_status: Record<string, number>;
+}
+
 export interface Category {
   id: number;
   name: string;
@@ -113,6 +148,7 @@ export interface AdminLoginData {
 export interface AdminToken {
   access_token: string;
   token_type: string;
+  refresh_token: string | null;
   admin: Admin;
 }
 
@@ -127,25 +163,52 @@ export const dashboardApi = {
   getProduct: (id: number) => api.get<Product>(`/products/${id}`),
   createProduct: (data: ProductFormData) => api.post<Product>('/products', data),
   updateProduct: (id: number, data: ProductFormData) => api.put<Product>(`/products/${id}`, data),
+  patchProduct: (id: number, data: Partial<ProductFormData>) => api.patch<Product>(`/products/${id}`, data),
   deleteProduct: (id: number) => api.delete(`/products/${id}`),
   
-  getOrders: () => api.get<Order[]>('/orders'),
+  getOrders: (params: OrderFilters = {}) => api.get<Order[]>('/orders', { params }),
   getOrder: (id: number) => api.get<Order>(`/orders/${id}`),
   createOrder: (data: OrderFormData) => api.post<Order>('/orders', data),
   updateOrder: (id: number, data: OrderFormData) => api.put<Order>(`/orders/${id}`, data),
+  patchOrder: (id: number, data: Partial<OrderFormData>) => api.patch<Order>(`/orders/${id}`, data),
   deleteOrder: (id: number) => api.delete(`/orders/${id}`),
+  bulkUpdateOrderStatus: (data: BulkStatusUpdate) => api.patch<BulkStatusResult>('/orders/bulk-status', data),
   
   getCategories: () => api.get<Category[]>('/categories'),
   getCategory: (id: number) => api.get<Category>(`/categories/${id}`),
   createCategory: (data: CategoryFormData) => api.post<Category>('/categories', data),
   updateCategory: (id: number, data: CategoryFormData) => api.put<Category>(`/categories/${id}`, data),
+  patchCategory: (id: number, data: Partial<CategoryFormData>) => api.patch<Category>(`/categories/${id}`, data),
   deleteCategory: (id: number) => api.delete(`/categories/${id}`),
   
   getCustomers: () => api.get<Customer[]>('/customers'),
   getCustomer: (id: number) => api.get<Customer>(`/customers/${id}`),
   createCustomer: (data: CustomerFormData) => api.post<Customer>('/customers', data),
   updateCustomer: (id: number, data: CustomerFormData) => api.put<Customer>(`/customers/${id}`, data),
+  patchCustomer: (id: number, data: Partial<CustomerFormData>) => api.patch<Customer>(`/customers/${id}`, data),
   deleteCustomer: (id: number) => api.delete(`/customers/${id}`),
 };
 
+export interface RevenueBucket {
+  bucket_start: string;
+  order_count: number;
+  revenue: number;
+  average_order_value: number;
+}
+
+export type Granularity = 'hour' | 'day' | 'week' | 'month';
+
+export interface ProductSales {
+  product: Product;
+  units: number;
+  revenue: number;
+}
+
+export const analyticsApi = {
+  getRevenue: (params: { granularity?: Granularity; status?: string; start?: string; end?: string } = {}) =>
+    api.get<RevenueBucket[]>('/analytics/revenue', { params }),
+  getTopProducts: (params: { window?: 7 | 30 | 90; by?: 'units' | 'revenue'; limit?: number } = {}) =>
+    api.get<ProductSales[]>('/analytics/top-products', { params }),
+};
+
 export default api;